@@ -9,43 +9,332 @@ This API exposes the pattern graph for:
 
 Endpoints:
 - GET /constellations - Query patterns by archetype, stage, domain
+- POST /constellations/batch - Query several contexts in one request
 - GET /patterns/{id}/related - Get related patterns
+- GET /patterns/autocomplete - Complete a typed prefix to pattern titles
 - GET /archetypes - List all archetypes with pattern counts
 - GET /stages - List all stages
 - GET /domains - List all domains
+- POST /constellations/blend - Query a weighted blend of contexts
+- GET /health - Database and connection pool health
+- GET /ready - Readiness probe, 200 once the caches are warm
+- GET /metrics - Prometheus metrics
+
+The database opens in the app's lifespan, not at import:
+    uvicorn src.api.constellation_api:app
+    uvicorn --factory src.api.constellation_api:create_app
 """
 
+import base64
+import hashlib
+import json
+import logging
 import os
 import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List
-from fastapi import FastAPI, Query, HTTPException
+from typing import Dict, Iterable, Iterator, Optional, List
+import kuzu
+from fastapi import APIRouter, FastAPI, Query, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.routing import Match
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from src.db.init_kuzu import get_connection
+from src.api import metrics
+from src.db.init_kuzu import get_connection, get_graph_version
+from src.db.pool import ConnectionPool
+from src.retrieval.constellations import ConstellationTable
+from src.retrieval.facets import FacetCatalogs
+from src.retrieval.graph_snapshot import GraphSnapshot
+from src.retrieval.similarity import SimilarityIndex, load_similarity_index
+from src.retrieval.trigram_index import TrigramIndex
+from src.retrieval.typeahead import TypeaheadIndex, build_typeahead_index
+
+API_VERSION = "1.0.0"
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Graph-derived endpoints: their responses only change when the loaders bump
+# the graph version, so they carry a version ETag and can be revalidated.
+CACHE_MAX_AGE = int(os.environ.get("CONTEXT_ENGINE_CACHE_MAX_AGE", "300"))
+CACHEABLE_PATHS = {"/constellations", "/archetypes", "/stages", "/domains"}
+
+
+def is_related_path(path: str) -> bool:
+    return path.startswith("/patterns/") and path.endswith("/related")
+
+
+def is_cacheable(path: str) -> bool:
+    return path in CACHEABLE_PATHS or is_related_path(path)
+
+
+def graph_etag(request: Request) -> str:
+    """Strong ETag for a request URL and representation at the current graph version.
+    
+    /related also reads the similarity index, so its tag covers the
+    extractions file the index was built from.
+    """
+    version = get_graph_version()
+    parts = [request.app.version, request.url.path, str(request.query_params),
+             request.headers.get("accept", "")]
+    if is_related_path(request.url.path):
+        parts.append(str(get_similarity().source_stamp.tolist()))
+    key = "\n".join(parts)
+    return f'"g{version}-{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+async def conditional_get(request: Request, call_next):
+    """Answer If-None-Match with 304 before any database work; tag fresh responses."""
+    if request.method != "GET" or not is_cacheable(request.url.path):
+        return await call_next(request)
+
+    try:
+        etag = graph_etag(request)
+    except Exception:
+        # e.g. the similarity index can't be built; let the endpoint report it
+        return await call_next(request)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}", "Vary": "Accept"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        revalidated = etag_matches(if_none_match, etag)
+        metrics.record_cache("etag", revalidated)
+        if revalidated:
+            return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update({k: v for k, v in headers.items() if k != "Vary"})
+        response.headers.append("Vary", "Accept")
+    return response
+
+
+def route_template(request: Request) -> str:
+    """The matched route's path template, so metric labels don't grow with path params."""
+    # The API's own routes, then the app's (docs, openapi.json)
+    for route in [*router.routes, *request.app.router.routes]:
+        if not hasattr(route, "path"):
+            continue
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
 
-app = FastAPI(
-    title="Commons OS Context Engine",
-    description="Pattern constellation queries for context-aware discovery",
-    version="1.0.0"
-)
 
-# CORS for Jekyll site
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Restrict in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def observe_requests(request: Request, call_next):
+    """Record per-route latency, status counts and requests in flight."""
+    route = route_template(request)
+    metrics.IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.IN_FLIGHT.dec()
+        metrics.REQUEST_LATENCY.labels(method=request.method, route=route).observe(time.perf_counter() - start)
+        metrics.REQUESTS.labels(method=request.method, route=route, status=status).inc()
+
+
+def server_error(e: Exception) -> HTTPException:
+    """Log an unexpected failure with its traceback and count it before answering 500."""
+    logger.exception("Unhandled error")
+    metrics.ERRORS.labels(exception=type(e).__name__).inc()
+    return HTTPException(status_code=500, detail=str(e))
+
+
+# Database connection pool. Sync endpoints run in FastAPI's worker threadpool
+# (40 threads by default), so size the pool to match; connections open lazily.
+# The database itself opens on first use or in the app's lifespan.
+POOL_SIZE = int(os.environ.get("CONTEXT_ENGINE_POOL_SIZE", "40"))
+WARM_CONNECTIONS = min(4, POOL_SIZE)
+db: Optional[kuzu.Database] = None
+pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def open_pool() -> ConnectionPool:
+    """Open the database and its connection pool, once per process."""
+    global db, pool
+    with _pool_lock:
+        if pool is None:
+            db, conn = get_connection()
+            conn.close()
+            pool = ConnectionPool(db, size=POOL_SIZE, connect=metrics.instrumented_connection)
+        return pool
+
+
+def close_pool() -> None:
+    """Close the pooled connections and the database."""
+    global db, pool
+    with _pool_lock:
+        if pool is not None:
+            pool.close()
+            db.close()
+            db, pool = None, None
+
+
+# In-memory Pattern-to-Pattern adjacency, rebuilt after the loaders run
+_snapshot: Optional[GraphSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> GraphSnapshot:
+    """Get the adjacency snapshot, rebuilding it if the graph has changed.
+    
+    A pooled connection is checked out only for a rebuild.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        fresh = _snapshot is not None and not _snapshot.is_stale()
+        metrics.record_cache("snapshot", fresh)
+        if not fresh:
+            with open_pool().connection() as conn:
+                _snapshot = GraphSnapshot.load(conn)
+        return _snapshot
+
+
+# Ranked patterns for every (archetype, stage, domain), rebuilt after the loaders run
+_constellations: Optional[ConstellationTable] = None
+_constellations_lock = threading.Lock()
+
+
+def get_constellations() -> ConstellationTable:
+    """Get the precomputed constellation table, rebuilding it if the graph has changed.
+    
+    A pooled connection is checked out only for a rebuild.
+    """
+    global _constellations
+    with _constellations_lock:
+        fresh = _constellations is not None and not _constellations.is_stale()
+        metrics.record_cache("constellations", fresh)
+        if not fresh:
+            with open_pool().connection() as conn:
+                _constellations = ConstellationTable.load(conn)
+        return _constellations
 
-# Database connection
-db, conn = get_connection()
+
+# Archetype/stage/domain catalogs, derived from the constellation table
+_facets: Optional[FacetCatalogs] = None
+_facets_lock = threading.Lock()
+
+
+def get_facets() -> FacetCatalogs:
+    """Get the facet catalogs, recomputing them when the graph has changed."""
+    global _facets
+    table = get_constellations()
+    with _facets_lock:
+        fresh = _facets is not None and _facets.version == table.version
+        metrics.record_cache("facets", fresh)
+        if not fresh:
+            _facets = FacetCatalogs.from_table(table)
+        return _facets
+
+
+# Top-K shared-context neighbors per pattern, rebuilt when the extractions change
+_similarity: Optional[SimilarityIndex] = None
+_similarity_lock = threading.Lock()
+
+
+def get_similarity() -> SimilarityIndex:
+    """Get the pattern context similarity index."""
+    global _similarity
+    with _similarity_lock:
+        fresh = _similarity is not None and not _similarity.is_stale()
+        metrics.record_cache("similarity", fresh)
+        if not fresh:
+            _similarity = load_similarity_index()
+        return _similarity
+
+
+# Title/slug prefix index for as-you-type lookups
+_typeahead: Optional[TypeaheadIndex] = None
+_typeahead_lock = threading.Lock()
+
+
+def get_typeahead() -> TypeaheadIndex:
+    """Get the typeahead index, rebuilding it if the graph has changed."""
+    global _typeahead
+    fresh = _typeahead is not None and not _typeahead.is_stale()
+    metrics.record_cache("typeahead", fresh)
+    if not fresh:
+        snapshot = get_snapshot()
+        with _typeahead_lock:
+            if _typeahead is None or _typeahead.is_stale():
+                with open_pool().connection() as conn:
+                    _typeahead = build_typeahead_index(conn, snapshot)
+    return _typeahead
+
+
+# Title trigrams for resolving misspelled pattern titles
+_trigrams: Optional[TrigramIndex] = None
+_trigrams_lock = threading.Lock()
+
+
+def get_trigram_index(snapshot: GraphSnapshot) -> TrigramIndex:
+    """Get the title trigram index, rebuilding it if the graph has changed."""
+    global _trigrams
+    fresh = _trigrams is not None and _trigrams.version == snapshot.version
+    metrics.record_cache("trigrams", fresh)
+    if not fresh:
+        with _trigrams_lock:
+            if _trigrams is None or _trigrams.version != snapshot.version:
+                _trigrams = TrigramIndex.from_snapshot(snapshot)
+    return _trigrams
+
+
+def resolve_title(snapshot: GraphSnapshot, title: str) -> Optional[str]:
+    """Resolve a requested title to a pattern title: exact match, else closest by trigrams."""
+    if title in snapshot.title_index:
+        return title
+    match = get_trigram_index(snapshot).best_match(title)
+    return match['title'] if match else None
+
+
+def warm_up() -> Dict[str, float]:
+    """Open the pool and build everything the endpoints read, in dependency order.
+    
+    Building the snapshot, constellation table and typeahead index scans the
+    Pattern, Archetype, Stage and Domain tables and every edge table the
+    endpoints use, so Kuzu's buffer pool is hot as well. Returns seconds per step.
+    """
+    timings = {}
+    
+    def step(name: str, build) -> None:
+        start = time.perf_counter()
+        build()
+        timings[name] = round(time.perf_counter() - start, 4)
+    
+    def connections() -> None:
+        connections = open_pool()
+        conns = [connections.checkout() for _ in range(WARM_CONNECTIONS)]
+        for conn in conns:
+            connections.checkin(conn, connections.ping(conn))
+    
+    step("pool", connections)
+    step("snapshot", get_snapshot)
+    step("constellations", get_constellations)
+    step("facets", get_facets)
+    step("similarity", get_similarity)
+    step("typeahead", get_typeahead)
+    step("trigrams", lambda: get_trigram_index(get_snapshot()))
+    return timings
 
 
 class PatternResult(BaseModel):
+    id: Optional[str] = None
     title: str
     strength: Optional[float] = None
     importance: Optional[float] = None
@@ -59,210 +348,491 @@ class ConstellationResponse(BaseModel):
     domain: Optional[str] = None
     patterns: List[PatternResult]
     total: int
+    next_cursor: Optional[str] = None
+
+
+class ConstellationQuery(BaseModel):
+    archetype: str
+    stage: Optional[str] = None
+    domain: Optional[str] = None
+    min_strength: float = 0.5
+    limit: int = 50
+    cursor: Optional[str] = None
+
+
+class ConstellationBatchRequest(BaseModel):
+    contexts: List[ConstellationQuery]
+
+
+class ConstellationBatchResponse(BaseModel):
+    results: List[ConstellationResponse]
+    total: int
+
+
+class BlendedConstellationQuery(BaseModel):
+    archetypes: Dict[str, float]
+    stages: Dict[str, float] = {}
+    domains: Dict[str, float] = {}
+    min_strength: float = 0.5
+    limit: int = 50
+    cursor: Optional[str] = None
+
+
+class BlendedConstellationResponse(BaseModel):
+    archetypes: Dict[str, float]
+    stages: Dict[str, float] = {}
+    domains: Dict[str, float] = {}
+    patterns: List[PatternResult]
+    total: int
+    next_cursor: Optional[str] = None
 
 
 class ArchetypeInfo(BaseModel):
     name: str
     pattern_count: int
     avg_strength: float
+    strength_histogram: List[int] = []
+    stages: Dict[str, int] = {}
+    domains: Dict[str, int] = {}
 
 
 class RelatedPattern(BaseModel):
+    id: Optional[str] = None
     title: str
     relationship_type: str
     shared_contexts: Optional[int] = None
+    score: Optional[float] = None
 
 
-@app.get("/")
+def encode_cursor(key: dict) -> str:
+    """Opaque keyset cursor for the last item of a page."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[dict]:
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        float(key["score"]), str(key["id"])
+        return key
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+NDJSON = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True if the client asked for a newline-delimited JSON stream."""
+    return NDJSON in request.headers.get("accept", "")
+
+
+def ndjson_response(items: Iterable[BaseModel]) -> StreamingResponse:
+    """Stream models as NDJSON, one line each, as the iterable produces them."""
+    return StreamingResponse((item.model_dump_json() + "\n" for item in items), media_type=NDJSON)
+
+
+def constellation_page(rows: list[dict], limit: int) -> tuple[List[PatternResult], Optional[str]]:
+    """Page of constellation rows (fetched with limit + 1) and the cursor for the next one."""
+    patterns = [
+        PatternResult(
+            id=p['pattern_id'],
+            title=p['title'],
+            strength=p['strength'],
+            importance=p['importance'],
+            specificity=p['specificity'],
+            score=p['score']
+        )
+        for p in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit and patterns:
+        next_cursor = encode_cursor({"score": patterns[-1].score, "id": patterns[-1].id})
+    return patterns, next_cursor
+
+
+class PatternCompletion(BaseModel):
+    id: str
+    title: str
+    slug: str
+    score: float
+
+
+@router.get("/")
 def root():
     """API health check and info."""
     return {
         "service": "Commons OS Context Engine",
-        "version": "1.0.0",
+        "version": API_VERSION,
         "endpoints": [
             "/constellations",
+            "/constellations/batch",
+            "/constellations/blend",
             "/patterns/{title}/related",
+            "/patterns/autocomplete",
             "/archetypes",
             "/stages",
-            "/domains"
+            "/domains",
+            "/health",
+            "/ready",
+            "/metrics"
         ]
     }
 
 
-@app.get("/constellations", response_model=ConstellationResponse)
+@router.get("/health")
+def health():
+    """Database reachability and connection pool usage."""
+    connections = open_pool()
+    with connections.connection() as conn:
+        ok = connections.ping(conn)
+    if not ok:
+        raise HTTPException(status_code=503, detail="Database not responding")
+    return {"status": "ok", "pool": connections.stats()}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """Readiness probe: 503 until the database is open and the caches are warm."""
+    state = request.app.state
+    if not getattr(state, "ready", False):
+        return JSONResponse(status_code=503, content={
+            "status": "failed" if getattr(state, "warmup_error", None) else "warming",
+            "error": getattr(state, "warmup_error", None)
+        })
+    return {"status": "ready", "graph_version": get_graph_version(), "warmup": state.warmup}
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: route latency, requests in flight, cache hits and Kuzu query timing."""
+    if pool is not None:
+        stats = pool.stats()
+        metrics.POOL_CONNECTIONS.labels(state="open").set(stats["open"])
+        metrics.POOL_CONNECTIONS.labels(state="idle").set(stats["idle"])
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/constellations", response_model=ConstellationResponse)
 def get_constellation(
+    request: Request,
     archetype: str = Query(..., description="Organizational archetype (e.g., Startup, Enterprise, City)"),
     stage: Optional[str] = Query(None, description="Journey stage (e.g., Validation, Growth, Transformation)"),
     domain: Optional[str] = Query(None, description="Domain (e.g., Technology, Finance, Healthcare)"),
     min_strength: float = Query(0.5, description="Minimum archetype fit strength"),
-    limit: int = Query(50, description="Maximum patterns to return")
+    limit: int = Query(50, description="Maximum patterns to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Query pattern constellations by context.
     
+    Results are ordered by score, then pattern id. Pass `next_cursor` back as
+    `cursor` to get the following page. With `Accept: application/x-ndjson`
+    the patterns are streamed one JSON object per line instead.
+    
     Examples:
     - /constellations?archetype=Startup&stage=Validation&domain=Finance
     - /constellations?archetype=Enterprise&stage=Transformation
     - /constellations?archetype=City&domain=Governance
     """
+    key = decode_cursor(cursor)
+    after = (float(key["score"]), str(key["id"])) if key else None
     try:
-        if stage and domain:
-            query = f'''
-                MATCH (p:Pattern)-[s:SUITED_FOR]->(a:Archetype {{name: "{archetype}"}})
-                MATCH (p)-[st:APPLIES_AT]->(stage:Stage {{name: "{stage}"}})
-                MATCH (p)-[d:RELEVANT_FOR]->(dom:Domain {{name: "{domain}"}})
-                WHERE s.strength >= {min_strength}
-                RETURN p.title, s.strength, st.importance, d.specificity
-                ORDER BY s.strength * st.importance DESC
-                LIMIT {limit}
-            '''
-        elif stage:
-            query = f'''
-                MATCH (p:Pattern)-[s:SUITED_FOR]->(a:Archetype {{name: "{archetype}"}})
-                MATCH (p)-[st:APPLIES_AT]->(stage:Stage {{name: "{stage}"}})
-                WHERE s.strength >= {min_strength}
-                RETURN p.title, s.strength, st.importance, null
-                ORDER BY s.strength * st.importance DESC
-                LIMIT {limit}
-            '''
-        elif domain:
-            query = f'''
-                MATCH (p:Pattern)-[s:SUITED_FOR]->(a:Archetype {{name: "{archetype}"}})
-                MATCH (p)-[d:RELEVANT_FOR]->(dom:Domain {{name: "{domain}"}})
-                WHERE s.strength >= {min_strength}
-                RETURN p.title, s.strength, null, d.specificity
-                ORDER BY s.strength DESC
-                LIMIT {limit}
-            '''
-        else:
-            query = f'''
-                MATCH (p:Pattern)-[s:SUITED_FOR]->(a:Archetype {{name: "{archetype}"}})
-                WHERE s.strength >= {min_strength}
-                RETURN p.title, s.strength, null, null
-                ORDER BY s.strength DESC
-                LIMIT {limit}
-            '''
-        
-        result = conn.execute(query)
-        patterns = []
-        while result.has_next():
-            row = result.get_next()
-            score = row[1] * (row[2] if row[2] else 1.0)
-            patterns.append(PatternResult(
-                title=row[0],
-                strength=row[1],
-                importance=row[2],
-                specificity=row[3],
-                score=score
-            ))
+        table = get_constellations()
+        if wants_ndjson(request):
+            return ndjson_response(
+                PatternResult(id=p['pattern_id'], title=p['title'], strength=p['strength'],
+                              importance=p['importance'], specificity=p['specificity'], score=p['score'])
+                for p in table.iter_query(archetype, stage, domain, min_strength, limit, after)
+            )
+        rows = table.query(archetype, stage, domain, min_strength, limit + 1, after)
+        patterns, next_cursor = constellation_page(rows, limit)
         
         return ConstellationResponse(
             archetype=archetype,
             stage=stage,
             domain=domain,
             patterns=patterns,
-            total=len(patterns)
+            total=len(patterns),
+            next_cursor=next_cursor
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise server_error(e)
 
 
-@app.get("/patterns/{title}/related")
-def get_related_patterns(
-    title: str,
-    limit: int = Query(20, description="Maximum related patterns")
+MAX_BATCH_CONTEXTS = 100
+
+
+@router.post("/constellations/batch", response_model=ConstellationBatchResponse)
+def get_constellations_batch(
+    request: ConstellationBatchRequest
 ):
-    """Get patterns related to a specific pattern through shared contexts and direct relationships."""
+    """
+    Query several pattern constellations in one request.
+    
+    Contexts are evaluated together against the precomputed constellation
+    table, sharing each archetype's strength filter across its contexts.
+    Results come back in request order.
+    """
+    if len(request.contexts) > MAX_BATCH_CONTEXTS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_CONTEXTS} contexts per batch")
+    contexts = []
+    for context in request.contexts:
+        key = decode_cursor(context.cursor)
+        contexts.append({
+            **context.model_dump(exclude={"cursor"}),
+            "limit": context.limit + 1,
+            "after": (float(key["score"]), str(key["id"])) if key else None
+        })
     try:
-        related = []
+        results = []
+        for context, rows in zip(request.contexts, get_constellations().query_many(contexts)):
+            patterns, next_cursor = constellation_page(rows, context.limit)
+            results.append(ConstellationResponse(
+                archetype=context.archetype,
+                stage=context.stage,
+                domain=context.domain,
+                patterns=patterns,
+                total=len(patterns),
+                next_cursor=next_cursor
+            ))
+        return ConstellationBatchResponse(results=results, total=len(results))
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.post("/constellations/blend", response_model=BlendedConstellationResponse)
+def get_blended_constellation(
+    request: Request,
+    query: BlendedConstellationQuery
+):
+    """
+    Query a pattern constellation for a weighted blend of contexts.
+    
+    For hybrid organizations, e.g. a Cooperative that is also a Network at
+    Growth or Expansion. Weights are relative within each facet and unknown
+    names are ignored. Every pattern is scored in one pass: weighted strength
+    x weighted importance x weighted share of the domains it is relevant to.
+    Results are ordered and paged like /constellations.
+    
+    Example body:
+    {"archetypes": {"Cooperative": 0.6, "Network": 0.4}, "stages": {"Growth": 1, "Expansion": 1}}
+    """
+    if not query.archetypes:
+        raise HTTPException(status_code=422, detail="At least one archetype is required")
+    if any(w < 0 for facet in [query.archetypes, query.stages, query.domains] for w in facet.values()):
+        raise HTTPException(status_code=422, detail="Weights must not be negative")
+    key = decode_cursor(query.cursor)
+    after = (float(key["score"]), str(key["id"])) if key else None
+    args = (query.archetypes, query.stages or None, query.domains or None, query.min_strength)
+    try:
+        table = get_constellations()
+        if wants_ndjson(request):
+            return ndjson_response(
+                PatternResult(id=p['pattern_id'], title=p['title'], strength=p['strength'],
+                              importance=p['importance'], specificity=p['specificity'], score=p['score'])
+                for p in table.iter_blend(*args, query.limit, after)
+            )
+        rows = table.blend(*args, query.limit + 1, after)
+        patterns, next_cursor = constellation_page(rows, query.limit)
         
-        # Direct relationships (ENABLES, REQUIRES, TENSIONS_WITH)
-        for rel_type in ["ENABLES", "REQUIRES", "TENSIONS_WITH"]:
-            query = f'''
-                MATCH (p1:Pattern {{title: "{title}"}})-[r:{rel_type}]->(p2:Pattern)
-                RETURN p2.title, "{rel_type}"
-            '''
-            result = conn.execute(query)
-            while result.has_next():
-                row = result.get_next()
-                related.append(RelatedPattern(
-                    title=row[0],
-                    relationship_type=row[1]
+        return BlendedConstellationResponse(
+            archetypes=query.archetypes,
+            stages=query.stages,
+            domains=query.domains,
+            patterns=patterns,
+            total=len(patterns),
+            next_cursor=next_cursor
+        )
+    except Exception as e:
+        raise server_error(e)
+
+
+def iter_related(snapshot: GraphSnapshot, similarity: SimilarityIndex, title: str,
+                 key: Optional[dict], limit: int) -> Iterator[RelatedPattern]:
+    """Related patterns after a keyset cursor, at most `limit`.
+    
+    Direct relationships come from the adjacency snapshot and shared-context
+    neighbors from the precomputed similarity index, so no query runs here.
+    """
+    nodes = snapshot.title_index.get(title, [])
+    
+    # Direct relationships (ENABLES, REQUIRES, TENSIONS_WITH)
+    direct = []
+    if key is None or key.get("section") == "direct":
+        for node in nodes:
+            for neighbor in snapshot.neighbors(str(snapshot.ids[node])):
+                weight = neighbor['strength'] if neighbor['strength'] is not None else neighbor['confidence']
+                direct.append(RelatedPattern(
+                    id=neighbor['pattern_id'],
+                    title=neighbor['title'],
+                    relationship_type=neighbor['relationship'],
+                    score=weight or 0.5
                 ))
+        direct.sort(key=lambda r: (-r.score, r.id, r.relationship_type))
+        if key is not None:
+            after = (-float(key["score"]), key["id"], key.get("rel", ""))
+            direct = [r for r in direct if (-r.score, r.id, r.relationship_type) > after]
+        direct = direct[:limit]
+        yield from direct
+    
+    # Shared context (archetypes, stages, domains), by (similarity, pattern id)
+    remaining = limit - len(direct)
+    if remaining <= 0:
+        return
+    best: dict[str, dict] = {}
+    for node in nodes:
+        for neighbor in similarity.similar(str(snapshot.ids[node])):
+            pid = neighbor['pattern_id']
+            if pid in snapshot.index and neighbor['score'] > best.get(pid, {}).get('score', -1.0):
+                best[pid] = neighbor
+    shared = sorted(best.values(), key=lambda n: (-n['score'], n['pattern_id']))
+    if key is not None and key.get("section") == "shared":
+        after = (-float(key["score"]), str(key["id"]))
+        shared = [n for n in shared if (-n['score'], n['pattern_id']) > after]
+    for neighbor in shared[:remaining]:
+        yield RelatedPattern(
+            id=neighbor['pattern_id'],
+            title=str(snapshot.titles[snapshot.index[neighbor['pattern_id']]]),
+            relationship_type="SHARED_CONTEXT",
+            shared_contexts=neighbor['shared_contexts'],
+            score=neighbor['score']
+        )
+
+
+def related_page(title: str, related: list[RelatedPattern], limit: int) -> dict:
+    """Page of related patterns (fetched with limit + 1) and the cursor for the next one."""
+    next_cursor = None
+    if len(related) > limit and limit > 0:
+        last = related[limit - 1]
+        if last.relationship_type == "SHARED_CONTEXT":
+            next_cursor = encode_cursor({"section": "shared", "score": last.score, "id": last.id})
+        else:
+            next_cursor = encode_cursor({"section": "direct", "score": last.score, "id": last.id,
+                                         "rel": last.relationship_type})
+    return {"pattern": title, "related": related[:limit], "next_cursor": next_cursor}
+
+
+@router.get("/patterns/{title}/related")
+def get_related_patterns(
+    title: str,
+    request: Request,
+    limit: int = Query(20, description="Maximum related patterns"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """Get patterns related to a specific pattern through shared contexts and direct relationships.
+    
+    Misspelled titles resolve to the closest pattern title; the response's
+    `pattern` is the title actually used. Direct relationships come first,
+    by edge strength, then the patterns whose archetypes, stages and
+    domains are most similar (top 100, by cosine similarity);
+    ties are ordered by pattern id. Pass `next_cursor` back as `cursor` to
+    get the following page. With `Accept: application/x-ndjson` the related
+    patterns are streamed one JSON object per line instead.
+    """
+    key = decode_cursor(cursor)
+    try:
+        snapshot = get_snapshot()
+        similarity = get_similarity()
+        resolved = resolve_title(snapshot, title)
+        related = iter_related(snapshot, similarity, resolved, key, limit + 1) if resolved else iter([])
         
-        # Shared archetypes
-        query = f'''
-            MATCH (p1:Pattern {{title: "{title}"}})-[:SUITED_FOR]->(a:Archetype)<-[:SUITED_FOR]-(p2:Pattern)
-            WHERE p1 <> p2
-            WITH p2.title AS related, COUNT(DISTINCT a) AS shared
-            ORDER BY shared DESC
-            LIMIT {limit}
-            RETURN related, shared
-        '''
-        result = conn.execute(query)
-        while result.has_next():
-            row = result.get_next()
-            related.append(RelatedPattern(
-                title=row[0],
-                relationship_type="SHARED_ARCHETYPES",
-                shared_contexts=row[1]
-            ))
+        if wants_ndjson(request):
+            return ndjson_response(islice(related, limit))
         
-        return {"pattern": title, "related": related[:limit]}
+        if resolved is None:
+            return {"pattern": title, "related": [], "next_cursor": None}
+        return related_page(resolved, list(related), limit)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise server_error(e)
+
+
+@router.get("/patterns/autocomplete")
+def autocomplete_patterns(
+    q: str = Query(..., description="Typed prefix of a pattern title or slug"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum completions")
+):
+    """Complete a prefix to pattern titles, most central patterns first."""
+    completions = [
+        PatternCompletion(id=c['pattern_id'], title=c['title'], slug=c['slug'], score=c['score'])
+        for c in get_typeahead().complete(q, limit)
+    ]
+    return {"query": q, "completions": completions}
 
 
-@app.get("/archetypes", response_model=List[ArchetypeInfo])
+@router.get("/archetypes", response_model=List[ArchetypeInfo])
 def list_archetypes():
-    """List all archetypes with pattern counts."""
-    query = '''
-        MATCH (a:Archetype)<-[s:SUITED_FOR]-(p:Pattern)
-        RETURN a.name AS name, COUNT(p) AS count, AVG(s.strength) AS avg_str
-        ORDER BY count DESC
-    '''
-    result = conn.execute(query)
-    archetypes = []
-    while result.has_next():
-        row = result.get_next()
-        archetypes.append(ArchetypeInfo(
-            name=row[0],
-            pattern_count=row[1],
-            avg_strength=row[2]
-        ))
-    return archetypes
-
-
-@app.get("/stages")
+    """List all archetypes with pattern counts, strength histograms and co-occurring stages/domains."""
+    return [ArchetypeInfo(**facet) for facet in get_facets().archetypes]
+
+
+@router.get("/stages")
 def list_stages():
-    """List all stages with pattern counts."""
-    query = '''
-        MATCH (s:Stage)<-[a:APPLIES_AT]-(p:Pattern)
-        RETURN s.name AS name, s.sequence AS seq, COUNT(p) AS count
-        ORDER BY seq
-    '''
-    result = conn.execute(query)
-    stages = []
-    while result.has_next():
-        row = result.get_next()
-        stages.append({"name": row[0], "sequence": row[1], "pattern_count": row[2]})
-    return stages
-
-
-@app.get("/domains")
+    """List all stages with pattern counts, importance histograms and co-occurring archetypes/domains."""
+    return get_facets().stages
+
+
+@router.get("/domains")
 def list_domains():
-    """List all domains with pattern counts."""
-    query = '''
-        MATCH (d:Domain)<-[r:RELEVANT_FOR]-(p:Pattern)
-        RETURN d.name AS name, COUNT(p) AS count
-        ORDER BY count DESC
-    '''
-    result = conn.execute(query)
-    domains = []
-    while result.has_next():
-        row = result.get_next()
-        domains.append({"name": row[0], "pattern_count": row[1]})
-    return domains
+    """List all domains with pattern counts, specificity counts and co-occurring archetypes/stages."""
+    return get_facets().domains
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the database at startup and warm the caches in the background.
+    
+    /health answers as soon as the database is open; /ready only once the
+    warm-up has finished, so deploys can hold traffic back until then.
+    """
+    app.state.ready = False
+    app.state.warmup = {}
+    app.state.warmup_error = None
+    await run_in_threadpool(open_pool)
+    
+    def warm() -> None:
+        try:
+            app.state.warmup = warm_up()
+            app.state.ready = True
+            logger.info("Context engine warm: %s", app.state.warmup)
+        except Exception as e:
+            logger.exception("Warm-up failed")
+            app.state.warmup_error = str(e)
+    
+    warmer = threading.Thread(target=warm, name="context-engine-warm-up", daemon=True)
+    warmer.start()
+    yield
+    app.state.ready = False
+    await run_in_threadpool(warmer.join)
+    close_pool()
+
+
+def create_app() -> FastAPI:
+    """Build the API app. Nothing touches the database until its lifespan starts."""
+    app = FastAPI(
+        title="Commons OS Context Engine",
+        description="Pattern constellation queries for context-aware discovery",
+        version=API_VERSION,
+        lifespan=lifespan
+    )
+    # Added before CORS so 304s still get the CORS headers
+    app.middleware("http")(conditional_get)
+    # CORS for Jekyll site
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Restrict in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Added last so it is outermost and also times 304s and CORS preflights
+    app.middleware("http")(observe_requests)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
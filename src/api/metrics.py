@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics for the Context Engine API
+
+A small, dependency-free registry of counters, gauges and histograms,
+rendered in the Prometheus text exposition format by GET /metrics:
+
+- HTTP latency (until response headers) and request counts per route template
+- requests in flight
+- hits and misses of the in-memory graph caches and of ETag revalidation
+- duration and errors of every Kuzu `execute`, labelled by query template
+
+Query templates are the registry name for prepared statements (see
+db/statements.py), else the query text with whitespace collapsed and literals
+replaced by `?`, so label cardinality stays bounded by the code, not the input.
+"""
+
+import abc
+import bisect
+import re
+import threading
+import time
+from typing import Any, Optional
+
+import kuzu
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_TEMPLATE_LENGTH = 120
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A new value holder for one combination of label values."""
+
+    def labels(self, **labels: str):
+        """The child metric for one combination of label values."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self, key: tuple[str, ...], child) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format(child.value)}"]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines += self._samples(key, child)
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _Buckets:
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self, key: tuple[str, ...], child: _Buckets) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip([*self.buckets, float("inf")], child.counts):
+            cumulative += count
+            le = f'le="{_format(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format(child.sum)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+REQUEST_LATENCY = Histogram(
+    "context_engine_http_request_duration_seconds",
+    "Time from request to response headers, by route template.",
+    ("method", "route"))
+REQUESTS = Counter(
+    "context_engine_http_requests_total",
+    "HTTP requests by route template and status code.",
+    ("method", "route", "status"))
+IN_FLIGHT = Gauge(
+    "context_engine_http_requests_in_flight",
+    "HTTP requests currently being handled.")
+ERRORS = Counter(
+    "context_engine_errors_total",
+    "Unhandled exceptions turned into HTTP 500 responses, by exception type.",
+    ("exception",))
+CACHE_REQUESTS = Counter(
+    "context_engine_cache_requests_total",
+    "Lookups of in-memory graph caches and ETag revalidations, by result (hit or miss).",
+    ("cache", "result"))
+QUERY_LATENCY = Histogram(
+    "context_engine_kuzu_query_duration_seconds",
+    "Kuzu execute() time by query template.",
+    ("query",))
+QUERY_ERRORS = Counter(
+    "context_engine_kuzu_query_errors_total",
+    "Kuzu execute() calls that raised, by query template.",
+    ("query",))
+POOL_CONNECTIONS = Gauge(
+    "context_engine_pool_connections",
+    "Kuzu connections in the pool, by state (open or idle).",
+    ("state",))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+_LITERALS = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|\b\d+(?:\.\d+)?\b')
+
+
+def query_template(query: Any) -> str:
+    """Bounded metric label for a query: its statement name, or its text with literals replaced by `?`."""
+    if not isinstance(query, str):
+        return getattr(query, "name", type(query).__name__)
+    template = _LITERALS.sub("?", " ".join(query.split()))
+    return template[:MAX_TEMPLATE_LENGTH]
+
+
+class InstrumentedConnection:
+    """kuzu.Connection wrapper that times every execute() by query template."""
+
+    def __init__(self, conn: kuzu.Connection):
+        self._conn = conn
+
+    def execute(self, query: Any, parameters: Optional[dict] = None):
+        template = query_template(query)
+        start = time.perf_counter()
+        try:
+            if parameters is None:
+                return self._conn.execute(query)
+            return self._conn.execute(query, parameters)
+        except Exception:
+            QUERY_ERRORS.labels(query=template).inc()
+            raise
+        finally:
+            QUERY_LATENCY.labels(query=template).observe(time.perf_counter() - start)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def instrumented_connection(db: kuzu.Database) -> InstrumentedConnection:
+    """Connection factory for ConnectionPool."""
+    return InstrumentedConnection(kuzu.Connection(db))
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
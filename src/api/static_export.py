@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Static Export of Context Engine Responses
+
+Pre-renders the common API views as JSON files, so the Jekyll site can be
+served from a CDN without calling the API at page-view time:
+
+    constellations/<archetype>/<stage or all>/<domain or all>.json
+    related/<pattern id>.json
+    archetypes.json, stages.json, domains.json
+
+Each file holds the body the API returns for the same request, i.e. the
+first page, whose `next_cursor` continues against the live API, with a gzip
+copy next to it (.json.gz) and optionally a brotli copy (.json.br).
+manifest.json records the export inputs (graph version, similarity index,
+options) and a content hash per file. A run with unchanged inputs does
+nothing; otherwise only files whose content changed are rewritten, and files
+for contexts that no longer exist are removed.
+
+Usage:
+    python src/api/static_export.py --out ../commons-os.github.io/assets/context
+    python src/api/static_export.py --brotli --force
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from src.api import constellation_api as api
+from src.db.init_kuzu import get_graph_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+EXPORT_DIR = DATA_DIR / "static_export"
+MANIFEST = "manifest.json"
+
+
+def slugify(name: str) -> str:
+    """File-safe name for a facet value, e.g. 'Exit/Succession' -> 'exit-succession'."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _slugs(names: list[str]) -> dict[str, str]:
+    slugs = {name: slugify(name) for name in names}
+    if len(set(slugs.values())) != len(slugs) or 'all' in slugs.values():
+        raise ValueError(f"Facet names don't map to unique file names: {sorted(names)}")
+    return slugs
+
+
+def encode(body) -> bytes:
+    """JSON bytes as the API sends them."""
+    return json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def render_documents(limit: int = 50, min_strength: float = 0.5,
+                     related_limit: int = 20) -> Iterator[tuple[str, bytes]]:
+    """Yield (relative path, JSON bytes) for every exported view."""
+    table = api.get_constellations()
+    archetypes = _slugs(table.archetypes)
+    stages = _slugs(table.stages)
+    domains = _slugs(table.domains)
+
+    for archetype in table.archetypes:
+        for stage in [None, *table.stages]:
+            for domain in [None, *table.domains]:
+                rows = table.query(archetype, stage, domain, min_strength, limit + 1)
+                patterns, next_cursor = api.constellation_page(rows, limit)
+                response = api.ConstellationResponse(
+                    archetype=archetype, stage=stage, domain=domain,
+                    patterns=patterns, total=len(patterns), next_cursor=next_cursor
+                )
+                path = (f"constellations/{archetypes[archetype]}/{stages[stage] if stage else 'all'}/"
+                        f"{domains[domain] if domain else 'all'}.json")
+                yield path, encode(response.model_dump(mode="json"))
+
+    facets = api.get_facets()
+    yield "archetypes.json", encode([api.ArchetypeInfo(**f).model_dump(mode="json") for f in facets.archetypes])
+    yield "stages.json", encode(facets.stages)
+    yield "domains.json", encode(facets.domains)
+
+    snapshot = api.get_snapshot()
+    similarity = api.get_similarity()
+    by_title: dict[str, bytes] = {}
+    for pattern_id, title in zip(snapshot.ids.tolist(), snapshot.titles.tolist()):
+        if title not in by_title:
+            related = list(api.iter_related(snapshot, similarity, title, None, related_limit + 1))
+            page = api.related_page(title, related, related_limit)
+            page["related"] = [r.model_dump(mode="json") for r in page["related"]]
+            by_title[title] = encode(page)
+        yield f"related/{pattern_id}.json", by_title[title]
+
+
+def _variants(path: str, use_brotli: bool) -> list[str]:
+    return [path, path + ".gz"] + ([path + ".br"] if use_brotli else [])
+
+
+def _write(target: Path, data: bytes) -> None:
+    """Write atomically, so a sync to the CDN never picks up a half-written file."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+
+
+def export(out: Path = EXPORT_DIR, limit: int = 50, min_strength: float = 0.5,
+           related_limit: int = 20, use_brotli: bool = False, force: bool = False) -> dict:
+    """Export all views to `out`, rewriting only what changed. Returns file counts."""
+    if use_brotli and brotli is None:
+        raise RuntimeError("brotli is not installed (pip install brotli)")
+
+    manifest_path = out / MANIFEST
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    inputs = {
+        'graph_version': get_graph_version(),
+        'similarity': api.get_similarity().source_stamp.tolist(),
+        'limit': limit,
+        'min_strength': min_strength,
+        'related_limit': related_limit,
+        'brotli': use_brotli
+    }
+    if not force and previous.get('inputs') == inputs:
+        return {'written': 0, 'unchanged': len(previous.get('files', {})), 'removed': 0}
+
+    old_files: dict[str, str] = previous.get('files', {})
+    files: dict[str, str] = {}
+    written = unchanged = 0
+    for path, data in render_documents(limit, min_strength, related_limit):
+        digest = hashlib.sha256(data).hexdigest()
+        files[path] = digest
+        variants = _variants(path, use_brotli)
+        if old_files.get(path) == digest and all((out / v).exists() for v in variants):
+            unchanged += 1
+            continue
+        _write(out / path, data)
+        _write(out / (path + ".gz"), gzip.compress(data, compresslevel=9, mtime=0))
+        if use_brotli:
+            _write(out / (path + ".br"), brotli.compress(data, quality=11))
+        written += 1
+
+    removed = 0
+    for path in old_files.keys() - files.keys():
+        for variant in _variants(path, True):
+            (out / variant).unlink(missing_ok=True)
+        removed += 1
+
+    _write(manifest_path, json.dumps({'inputs': inputs, 'files': files}, indent=2, sort_keys=True).encode())
+    return {'written': written, 'unchanged': unchanged, 'removed': removed}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export constellations, facets and related patterns as static JSON")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR, help="Output directory")
+    parser.add_argument("--limit", type=int, default=50, help="Patterns per constellation")
+    parser.add_argument("--min-strength", type=float, default=0.5, help="Minimum archetype fit strength")
+    parser.add_argument("--related-limit", type=int, default=20, help="Related patterns per pattern")
+    parser.add_argument("--brotli", action="store_true", help="Also write .br files (needs brotli)")
+    parser.add_argument("--force", action="store_true", help="Re-render even if the inputs are unchanged")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = export(args.out, args.limit, args.min_strength, args.related_limit, args.brotli, args.force)
+    print(f"✓ {counts['written']} written, {counts['unchanged']} unchanged, {counts['removed']} removed "
+          f"in {time.perf_counter() - start:.1f}s -> {args.out}")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Compute Materialized Pattern Metrics
+
+Batch job run after the loaders. It computes per-pattern degree (in/out per
+relationship type), weighted degree, approximate betweenness and PageRank,
+plus relationship counts, and writes them to a side table
+(data/pattern_metrics.json) stamped with the graph version. Top-k reads such
+as HybridRetriever.get_most_connected then become list slices instead of
+full edge scans.
+
+Usage:
+    python src/db/compute_metrics.py
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection, get_graph_version
+from retrieval.graph_snapshot import GraphSnapshot
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+METRICS_FILE = DATA_DIR / "pattern_metrics.json"
+
+BETWEENNESS_SAMPLES = 256
+RANKED_METRICS = ['connections', 'weighted_degree', 'betweenness', 'pagerank']
+
+
+def get_pattern_rel_tables(conn) -> list[tuple[str, str, str]]:
+    """List (rel_type, from_table, to_table) for relationships touching Pattern."""
+    result = conn.execute("CALL show_tables() RETURN name, type")
+    rel_types = []
+    while result.has_next():
+        name, table_type = result.get_next()
+        if table_type == 'REL':
+            rel_types.append(name)
+
+    tables = []
+    for rel_type in sorted(rel_types):
+        result = conn.execute(f"CALL show_connection('{rel_type}') RETURN *")
+        while result.has_next():
+            row = result.get_next()
+            if 'Pattern' in (row[0], row[1]):
+                tables.append((rel_type, row[0], row[1]))
+    return tables
+
+
+def count_degrees(conn, snapshot: GraphSnapshot) -> tuple[dict, dict]:
+    """Per-pattern in/out degree for every relationship table touching Pattern."""
+    degrees: dict[str, dict[str, np.ndarray]] = {}
+    counts: dict[str, int] = {}
+    n = len(snapshot)
+
+    for rel_type, from_table, to_table in get_pattern_rel_tables(conn):
+        per_type = degrees.setdefault(rel_type, {
+            'out': np.zeros(n, dtype=np.int64),
+            'in': np.zeros(n, dtype=np.int64)
+        })
+        result = conn.execute(f"MATCH (:{from_table})-[r:{rel_type}]->(:{to_table}) RETURN COUNT(r)")
+        counts[rel_type] = counts.get(rel_type, 0) + result.get_next()[0]
+
+        for direction, table, query in [
+            ('out', from_table, f"MATCH (p:Pattern)-[r:{rel_type}]->(:{to_table}) RETURN p.id, COUNT(r)"),
+            ('in', to_table, f"MATCH (:{from_table})-[r:{rel_type}]->(p:Pattern) RETURN p.id, COUNT(r)"),
+        ]:
+            if table != 'Pattern':
+                continue
+            result = conn.execute(query)
+            while result.has_next():
+                pid, count = result.get_next()
+                if pid in snapshot.index:
+                    per_type[direction][snapshot.index[pid]] += count
+
+    return degrees, counts
+
+
+def compute_metrics(conn=None) -> dict:
+    """Compute all pattern metrics from the current graph."""
+    if conn is None:
+        db, conn = get_connection()
+    version = get_graph_version()
+    snapshot = GraphSnapshot.load(conn)
+    n = len(snapshot)
+
+    degrees, counts = count_degrees(conn, snapshot)
+    connections = np.zeros(n, dtype=np.int64)
+    for per_type in degrees.values():
+        connections += per_type['out'] + per_type['in']
+
+    weighted_degree = np.zeros(n)
+    for rel_type, csr in snapshot.out_edges.items():
+        weights = snapshot.edge_weights(csr)
+        sources = np.repeat(np.arange(n), csr.degree())
+        weighted_degree += np.bincount(sources, weights=weights, minlength=n)
+        weighted_degree += np.bincount(csr.targets, weights=weights, minlength=n)
+
+    betweenness = snapshot.approximate_betweenness(BETWEENNESS_SAMPLES)
+    pagerank = snapshot.personalized_pagerank([])
+
+    values = {
+        'connections': connections,
+        'weighted_degree': weighted_degree,
+        'betweenness': betweenness,
+        'pagerank': pagerank
+    }
+
+    patterns = []
+    for i in range(n):
+        patterns.append({
+            'pattern_id': str(snapshot.ids[i]),
+            'title': str(snapshot.titles[i]),
+            'connections': int(connections[i]),
+            'degree': {
+                rel_type: {'out': int(d['out'][i]), 'in': int(d['in'][i])}
+                for rel_type, d in degrees.items()
+                if d['out'][i] or d['in'][i]
+            },
+            'weighted_degree': round(float(weighted_degree[i]), 6),
+            'betweenness': round(float(betweenness[i]), 6),
+            'pagerank': float(pagerank[i])
+        })
+
+    # Pre-sorted rankings (pattern row numbers), so top-k reads are slices
+    rankings = {
+        metric: np.lexsort((np.arange(n), -values[metric])).tolist()
+        for metric in RANKED_METRICS
+    }
+
+    return {
+        'graph_version': version,
+        'computed_at': datetime.now().isoformat(),
+        'relationship_counts': counts,
+        'patterns': patterns,
+        'rankings': rankings
+    }
+
+
+def save_metrics(metrics: dict, path: Path = METRICS_FILE) -> None:
+    """Write the metrics side table."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(metrics, f)
+    os.replace(tmp_path, path)
+
+
+def load_metrics(path: Path = METRICS_FILE) -> Optional[dict]:
+    """Load the metrics side table if it matches the current graph version."""
+    if not path.exists():
+        return None
+    with open(path) as f:
+        metrics = json.load(f)
+    if metrics.get('graph_version') != get_graph_version():
+        return None
+    return metrics
+
+
+def check_metric(metric: str) -> None:
+    """Raise ValueError unless metric is one of RANKED_METRICS."""
+    if metric not in RANKED_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(RANKED_METRICS)}")
+
+
+def top_patterns(metrics: dict, metric: str, limit: int = 10) -> list[dict]:
+    """Top patterns by a precomputed metric."""
+    check_metric(metric)
+    patterns = metrics['patterns']
+    return [patterns[i] for i in metrics['rankings'][metric][:limit]]
+
+
+def compute_and_save_metrics(conn=None) -> dict:
+    """Recompute the metrics side table for the current graph."""
+    metrics = compute_metrics(conn)
+    save_metrics(metrics)
+    return metrics
+
+
+def main():
+    """Compute metrics and print a summary."""
+    start = time.perf_counter()
+    metrics = compute_and_save_metrics()
+    print(f"✓ Computed metrics for {len(metrics['patterns'])} patterns "
+          f"(graph v{metrics['graph_version']}) in {time.perf_counter() - start:.1f}s")
+    print(f"  Saved to {METRICS_FILE}")
+
+    for metric in RANKED_METRICS:
+        print(f"\nTop 5 by {metric}:")
+        for p in top_patterns(metrics, metric, 5):
+            print(f"  {p[metric]:10.4f}  {p['title']}")
+
+
+if __name__ == "__main__":
+    main()
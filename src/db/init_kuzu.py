@@ -9,14 +9,22 @@ Author: higgerix
 Date: 2026-02-02
 """
 
+import json
 import kuzu
 import os
 import shutil
+from datetime import datetime
 from pathlib import Path
 
 # Database path
 DB_PATH = Path(__file__).parent.parent.parent / "data" / "context_engine.db"
 
+# Graph version stamp, bumped by the loaders so in-memory snapshots can
+# tell when they are stale
+VERSION_PATH = DB_PATH.parent / "graph_version.json"
+
+_version_cache: tuple = (None, {})
+
 
 def create_schema(conn: kuzu.Connection) -> None:
     """Create all node and relationship tables."""
@@ -219,6 +227,78 @@ def get_connection() -> tuple[kuzu.Database, kuzu.Connection]:
     return db, conn
 
 
+def _read_versions() -> dict:
+    """Contents of the version file, re-read only when the file changes."""
+    global _version_cache
+    try:
+        stat = VERSION_PATH.stat()
+    except FileNotFoundError:
+        return {}
+
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _version_cache[0] != stamp:
+        try:
+            with open(VERSION_PATH) as f:
+                _version_cache = (stamp, json.load(f))
+        except (OSError, ValueError):
+            pass
+    return _version_cache[1]
+
+
+def get_graph_version() -> int:
+    """Get the current graph version (0 if the loaders have never bumped it)."""
+    return int(_read_versions().get('version', 0))
+
+
+def get_content_version() -> int:
+    """Get the version of the pattern text (titles, summaries, content).
+
+    Only load_patterns bumps it, so the BM25 and embedding indexes built from
+    pattern text stay valid when relationships are reloaded.
+    """
+    return int(_read_versions().get('content_version', 0))
+
+
+def bump_graph_version(updated_by: str, content_changed: bool = False) -> int:
+    """Increment the graph version after the graph has been modified.
+
+    Pass content_changed=True when pattern text was (re)loaded, to also
+    increment the content version.
+    """
+    versions = _read_versions()
+    version = int(versions.get('version', 0)) + 1
+    content_version = int(versions.get('content_version', 0)) + (1 if content_changed else 0)
+    VERSION_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = VERSION_PATH.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'version': version,
+            'content_version': content_version,
+            'updated_at': datetime.now().isoformat(),
+            'updated_by': updated_by
+        }, f, indent=2)
+    os.replace(tmp_path, VERSION_PATH)
+    return version
+
+
+def get_rel_properties(conn: kuzu.Connection, rel_type: str) -> set[str]:
+    """Get the property names of a relationship table (empty if it doesn't exist).
+
+    init_database() and load_relationships.py create the Pattern-to-Pattern
+    tables with different weight columns (strength vs confidence), so readers
+    check which one is present before referencing it.
+    """
+    try:
+        result = conn.execute(f"CALL table_info('{rel_type}') RETURN name")
+    except RuntimeError:
+        return set()
+    properties = set()
+    while result.has_next():
+        properties.add(result.get_next()[0])
+    return properties
+
+
 if __name__ == "__main__":
     import argparse
     
@@ -12,11 +12,17 @@ Date: 2026-02-02
 import kuzu
 import yaml
 import re
+import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Any
 
-from init_kuzu import get_connection, DB_PATH
+from init_kuzu import get_connection, bump_graph_version, DB_PATH
+from compute_metrics import compute_and_save_metrics
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from retrieval.bm25_index import build_bm25_index
+from retrieval.vector_index import build_embedding_index
 
 # Path to patterns repository
 PATTERNS_REPO = Path("/home/ubuntu/work/patterns-repo")
@@ -161,6 +167,11 @@ def load_patterns() -> int:
             errors += 1
     
     print(f"\n✓ Loaded {loaded} patterns ({errors} errors)")
+    
+    # Invalidate caches and indexes built from the previous graph and pattern text
+    if loaded:
+        version = bump_graph_version('load_patterns', content_changed=True)
+        print(f"✓ Graph version is now {version}")
     return loaded
 
 
@@ -184,3 +195,12 @@ def verify_load() -> None:
 if __name__ == "__main__":
     load_patterns()
     verify_load()
+    
+    index = build_embedding_index()
+    print(f"\n✓ Embedded {len(index)} patterns ({index.backend} backend)")
+    
+    keyword_index = build_bm25_index()
+    print(f"✓ Indexed {len(keyword_index)} patterns for keyword search")
+    
+    metrics = compute_and_save_metrics()
+    print(f"✓ Computed metrics for {len(metrics['patterns'])} patterns")
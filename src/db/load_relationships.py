@@ -16,7 +16,8 @@ from datetime import datetime
 
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from db.init_kuzu import get_connection
+from db.init_kuzu import get_connection, bump_graph_version
+from db.compute_metrics import compute_and_save_metrics
 
 # Configuration
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
@@ -143,6 +144,10 @@ def load_relationships_to_kuzu(relationships: list[dict]) -> dict:
         if (i + 1) % 100 == 0:
             print(f"  Processed {i + 1}/{len(relationships)}...")
     
+    # Invalidate in-memory graph snapshots
+    if results['loaded']:
+        results['graph_version'] = bump_graph_version('load_relationships')
+    
     return results
 
 
@@ -201,6 +206,11 @@ def main():
     print(f"\nVerification (edges in graph):")
     for rel_type, count in counts.items():
         print(f"  {rel_type}: {count}")
+    
+    # Materialize degree/centrality metrics for the new graph version
+    print("\nComputing pattern metrics...")
+    metrics = compute_and_save_metrics()
+    print(f"  ✓ Metrics for {len(metrics['patterns'])} patterns (graph v{metrics['graph_version']})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of Kuzu connections to one database.
+
+A kuzu.Connection runs one query at a time, so concurrent callers each check
+out their own connection to the shared kuzu.Database instead of serializing
+on a single one. Connections that sat idle longer than `check_interval`, or
+that were in use when a query failed, are pinged before reuse and replaced
+if they no longer answer. `connect` lets callers wrap the connections they
+get, e.g. to instrument them.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import kuzu
+
+
+class PoolExhausted(RuntimeError):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections, created lazily up to `size`."""
+
+    def __init__(self, db: kuzu.Database, size: int = 4, timeout: Optional[float] = 30.0,
+                 check_interval: Optional[float] = 30.0,
+                 connect: Callable[[kuzu.Database], kuzu.Connection] = kuzu.Connection):
+        self.db = db
+        self.size = size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.connect = connect
+        # Idle connections with the time they were checked in
+        self._idle: queue.LifoQueue[tuple[kuzu.Connection, float]] = queue.LifoQueue()
+        self._created = 0
+        self._replaced = 0
+        self._lock = threading.Lock()
+
+    def _new_connection(self) -> kuzu.Connection:
+        return self.connect(self.db)
+
+    @staticmethod
+    def ping(conn: kuzu.Connection) -> bool:
+        """True if the connection still answers a trivial query."""
+        try:
+            conn.execute("RETURN 1").get_next()
+            return True
+        except Exception:
+            return False
+
+    def _healthy(self, conn: kuzu.Connection, idle_since: float) -> kuzu.Connection:
+        """The connection if it passes its health check, else a fresh one."""
+        if self.check_interval is None or time.monotonic() - idle_since < self.check_interval:
+            return conn
+        if self.ping(conn):
+            return conn
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._replaced += 1
+        return self._new_connection()
+
+    def checkout(self, timeout: Optional[float] = None) -> kuzu.Connection:
+        """Take a connection, opening a new one if the pool isn't full yet."""
+        try:
+            return self._healthy(*self._idle.get_nowait())
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._new_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            idle = self._idle.get(timeout=self.timeout if timeout is None else timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"No Kuzu connection available (pool size {self.size})")
+        return self._healthy(*idle)
+
+    def checkin(self, conn: kuzu.Connection, healthy: bool = True) -> None:
+        """Return a connection to the pool; unhealthy ones are marked for a check."""
+        self._idle.put((conn, time.monotonic() if healthy else float('-inf')))
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[kuzu.Connection]:
+        """Check out a connection for the duration of a `with` block."""
+        conn = self.checkout(timeout)
+        healthy = True
+        try:
+            yield conn
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self.checkin(conn, healthy)
+
+    def stats(self) -> dict:
+        return {'size': self.size, 'open': self._created, 'idle': self._idle.qsize(),
+                'replaced': self._replaced}
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
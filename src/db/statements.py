@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Registry of named, parameterized Cypher statements.
+
+Queries are registered once, by name, with `$parameters` in place of values,
+so user input never becomes query text. Each statement is prepared on a
+connection the first time it runs there and the compiled plan is reused for
+every later call on that connection, skipping Kuzu's parse and plan steps.
+Prepared statements live on the connection object, so they go away with
+closed or replaced pooled connections, and carry their registry name, which
+the API's query metrics use as the label.
+"""
+
+from typing import Optional
+
+import kuzu
+
+STATEMENTS: dict[str, str] = {}
+
+
+def register(name: str, query: str) -> str:
+    """Register a statement under a unique name; returns the name."""
+    existing = STATEMENTS.get(name)
+    if existing is not None and existing != query:
+        raise ValueError(f"Statement {name!r} is already registered with a different query")
+    STATEMENTS[name] = query
+    return name
+
+
+def prepare(conn: kuzu.Connection, name: str) -> kuzu.PreparedStatement:
+    """The named statement prepared on `conn`, compiling it on first use."""
+    # A connection runs one query at a time, so its statements need no lock
+    statements = getattr(conn, '_prepared_statements', None)
+    if statements is None:
+        statements = conn._prepared_statements = {}
+    prepared = statements.get(name)
+    if prepared is None:
+        conn.init_connection()
+        prepared = kuzu.PreparedStatement(conn, STATEMENTS[name])
+        if not prepared.is_success():
+            raise RuntimeError(prepared.get_error_message())
+        prepared.name = name
+        statements[name] = prepared
+    return prepared
+
+
+def run(conn: kuzu.Connection, name: str, parameters: Optional[dict] = None) -> kuzu.QueryResult:
+    """Execute a registered statement on `conn` with its parameters."""
+    return conn.execute(prepare(conn, name), parameters or {})
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Asyncio Hybrid Retrieval for Context Engine
+
+AsyncHybridRetriever wraps HybridRetriever for asyncio callers. Each call
+checks a connection out of a bounded pool on a worker thread, so independent
+sub-queries for one request (neighbors, info, search) run in parallel and
+concurrent callers don't serialize on a single kuzu.Connection. Indexes,
+the adjacency snapshot and the lookup cache are shared by all workers.
+
+Usage:
+    async with AsyncHybridRetriever(pool_size=4) as retriever:
+        info, neighbors = await asyncio.gather(
+            retriever.get_pattern_info(pid),
+            retriever.graph_neighbors(pid),
+        )
+"""
+
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection
+from db.pool import ConnectionPool
+from retrieval.hybrid_retrieval import HybridRetriever
+
+DEFAULT_POOL_SIZE = min(8, os.cpu_count() or 4)
+
+
+class AsyncHybridRetriever:
+    """Async facade over HybridRetriever backed by a Kuzu connection pool."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, cache_size: int = 1024,
+                 cache_ttl: Optional[float] = None):
+        db, conn = get_connection()
+        self.pool = ConnectionPool(db, size=pool_size)
+        self._retriever = HybridRetriever(cache_size, cache_ttl, db=db, conn=conn)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size,
+                                            thread_name_prefix="retrieval")
+
+    @property
+    def cache(self):
+        return self._retriever.cache
+
+    def _call(self, method: str, *args, **kwargs):
+        with self.pool.connection() as conn:
+            return getattr(self._retriever.fork(conn), method)(*args, **kwargs)
+
+    async def _run(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._call, method, *args, **kwargs)
+        )
+
+    async def warm(self) -> None:
+        """Load indexes and the adjacency snapshot before serving traffic."""
+        await self._run('hybrid_search', 'warm up', 1)
+
+    async def get_pattern_info(self, pattern_id: str) -> Optional[dict]:
+        return await self._run('get_pattern_info', pattern_id)
+
+    async def search_by_title(self, query: str, limit: int = 10) -> list[dict]:
+        return await self._run('search_by_title', query, limit)
+
+    async def autocomplete(self, prefix: str, limit: int = 10) -> list[dict]:
+        return await self._run('autocomplete', prefix, limit)
+
+    async def fuzzy_search(self, query: str, limit: int = 10) -> list[dict]:
+        return await self._run('fuzzy_search', query, limit)
+
+    async def keyword_search(self, query: str, k: int = 10) -> list[dict]:
+        return await self._run('keyword_search', query, k)
+
+    async def vector_search(self, query: str, k: int = 10) -> list[dict]:
+        return await self._run('vector_search', query, k)
+
+    async def hybrid_search(self, query: str, k: int = 10, **kwargs) -> dict:
+        return await self._run('hybrid_search', query, k, **kwargs)
+
+    async def graph_neighbors(self, pattern_id: str) -> list[dict]:
+        return await self._run('graph_neighbors', pattern_id)
+
+    async def graph_neighbors_many(self, pattern_ids: list[str]) -> dict[str, list[dict]]:
+        return await self._run('graph_neighbors_many', pattern_ids)
+
+    async def context_rank(self, seed_ids: list[str], k: int = 10, **kwargs) -> list[dict]:
+        return await self._run('context_rank', seed_ids, k, **kwargs)
+
+    async def expand_paths(self, pattern_id: str, hops: int = 3, beam: int = 32,
+                           **kwargs) -> list[dict]:
+        return await self._run('expand_paths', pattern_id, hops, beam, **kwargs)
+
+    async def get_relationship_stats(self) -> dict:
+        return await self._run('get_relationship_stats')
+
+    async def get_most_connected(self, limit: int = 10) -> list[dict]:
+        return await self._run('get_most_connected', limit)
+
+    async def get_pattern_context(self, pattern_id: str) -> dict:
+        """Pattern info and neighbors, fetched concurrently."""
+        info, neighbors = await asyncio.gather(
+            self.get_pattern_info(pattern_id),
+            self.graph_neighbors(pattern_id),
+        )
+        return {'pattern': info, 'neighbors': neighbors}
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._retriever.close()
+        self.pool.close()
+
+    async def __aenter__(self) -> "AsyncHybridRetriever":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+async def demo():
+    """Run a search and fetch context for every hit concurrently."""
+    async with AsyncHybridRetriever() as retriever:
+        await retriever.warm()
+        hits = await retriever.keyword_search("lean", 5)
+        contexts = await asyncio.gather(
+            *(retriever.get_pattern_context(hit['pattern_id']) for hit in hits)
+        )
+        for context in contexts:
+            print(f"  {context['pattern']['title']}: {len(context['neighbors'])} related patterns")
+        print(f"\nPool: {retriever.pool.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(demo())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+BM25 Full-Text Index over Pattern title, summary and content
+
+An inverted index stored as CSR postings (term -> doc ids) with the BM25F
+impact of each posting precomputed at build time, so a query only touches
+the postings of its own terms and ranking is a bincount plus argpartition.
+
+Field boosts are applied to term frequencies before saturation (BM25F), so a
+title hit counts for more than the same word deep in the content.
+
+Usage:
+    python src/retrieval/bm25_index.py            # build and save the index
+    python src/retrieval/bm25_index.py "lean"     # build, then query
+"""
+
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection, get_content_version
+from retrieval.vector_index import fetch_pattern_texts
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+INDEX_FILE = DATA_DIR / "bm25_index.npz"
+
+FIELD_BOOSTS = {'title': 3.0, 'summary': 1.5, 'content': 1.0}
+K1 = 1.2
+B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or that the
+    this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens without stop words."""
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25F posting impacts."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, summaries: np.ndarray,
+                 terms: np.ndarray, offsets: np.ndarray, doc_ids: np.ndarray,
+                 impacts: np.ndarray, version: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.summaries = summaries
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.version = version
+        self.vocab = {term: i for i, term in enumerate(terms.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, patterns: list[dict]) -> "BM25Index":
+        """Index patterns (dicts with id, title, summary, content)."""
+        n_docs = len(patterns)
+        fields = list(FIELD_BOOSTS)
+
+        # Per-field term frequencies and lengths
+        field_tfs: list[list[dict[str, int]]] = []
+        lengths = np.zeros((len(fields), n_docs), dtype=np.float32)
+        for f, field in enumerate(fields):
+            tfs = []
+            for d, p in enumerate(patterns):
+                tokens = tokenize(p.get(field))
+                lengths[f, d] = len(tokens)
+                tf: dict[str, int] = {}
+                for token in tokens:
+                    tf[token] = tf.get(token, 0) + 1
+                tfs.append(tf)
+            field_tfs.append(tfs)
+
+        avg_lengths = np.maximum(lengths.mean(axis=1, keepdims=True), 1.0)
+        norms = 1 - B + B * lengths / avg_lengths
+
+        # BM25F pseudo term frequency per (term, doc)
+        combined: dict[str, dict[int, float]] = {}
+        for f, field in enumerate(fields):
+            boost = FIELD_BOOSTS[field]
+            for d, tf in enumerate(field_tfs[f]):
+                for term, count in tf.items():
+                    postings = combined.setdefault(term, {})
+                    postings[d] = postings.get(d, 0.0) + boost * count / norms[f, d]
+
+        terms = np.array(sorted(combined))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, impacts = [], []
+        for t, term in enumerate(terms.tolist()):
+            postings = combined[term]
+            idf = np.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for d in sorted(postings):
+                tf = postings[d]
+                doc_ids.append(d)
+                impacts.append(idf * tf * (K1 + 1) / (tf + K1))
+            offsets[t + 1] = len(doc_ids)
+
+        return cls(
+            np.array([p['id'] for p in patterns]),
+            np.array([p['title'] or '' for p in patterns]),
+            np.array([p['summary'] or '' for p in patterns]),
+            terms, offsets,
+            np.array(doc_ids, dtype=np.int32),
+            np.array(impacts, dtype=np.float32),
+        )
+
+    def save(self, path: Path = INDEX_FILE) -> None:
+        """Persist the index next to the database, replacing the file atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=self.ids, titles=self.titles, summaries=self.summaries,
+                     terms=self.terms, offsets=self.offsets, doc_ids=self.doc_ids,
+                     impacts=self.impacts, version=np.array(self.version))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> "BM25Index":
+        """Load a previously saved index."""
+        with np.load(path) as data:
+            return cls(data['ids'], data['titles'], data['summaries'], data['terms'],
+                       data['offsets'], data['doc_ids'], data['impacts'],
+                       version=int(data['version']) if 'version' in data else 0)
+
+    def search(self, query: str, k: int = 10) -> list[dict]:
+        """Top-k patterns by BM25F score."""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return []
+
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        impacts = np.concatenate([self.impacts[s] for s in slices])
+
+        # Sum impacts per matching doc, touching only the postings read
+        matched, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=impacts)
+
+        k = min(k, len(matched))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                'pattern_id': str(self.ids[matched[i]]),
+                'title': str(self.titles[matched[i]]),
+                'summary': str(self.summaries[matched[i]]),
+                'score': float(scores[i])
+            }
+            for i in top
+        ]
+
+
+def build_bm25_index(conn=None, path: Path = INDEX_FILE) -> BM25Index:
+    """Index every pattern in the graph and save the index."""
+    if conn is None:
+        db, conn = get_connection()
+    version = get_content_version()
+    index = BM25Index.build(fetch_pattern_texts(conn))
+    index.version = version
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the pattern BM25 index")
+    parser.add_argument("query", nargs="?", help="Optional query to run after building")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_bm25_index()
+    print(f"✓ Indexed {len(index)} patterns, {len(index.terms)} terms, "
+          f"{len(index.doc_ids)} postings in {time.perf_counter() - start:.1f}s -> {INDEX_FILE}")
+
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, 10)
+        print(f"\nTop matches for '{args.query}' ({(time.perf_counter() - start) * 1000:.2f} ms):")
+        for hit in hits:
+            print(f"  {hit['score']:.3f}  {hit['title']}")
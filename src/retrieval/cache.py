@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Versioned LRU/TTL Cache for Graph Lookups
+
+The graph only changes when the loaders run, and every loader bumps the
+graph version (see db.init_kuzu.bump_graph_version). Entries are tagged with
+the version they were computed under, so a lookup after a reload is a miss
+rather than a stale hit. Size is bounded by LRU eviction, with an optional
+TTL for callers that also want time-based expiry.
+"""
+
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_graph_version
+
+_MISSING = object()
+
+
+class VersionedCache:
+    """Thread-safe LRU cache invalidated by graph version changes."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 version_fn: Callable[[], int] = get_graph_version):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._version = version_fn()
+        self._lock = threading.Lock()
+
+    def _sync_version(self) -> int:
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or `default` on a miss."""
+        with self._lock:
+            self._sync_version()
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at and time.monotonic() > expires_at:
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """Store a value computed under `version` (dropped if the graph moved on)."""
+        with self._lock:
+            if self._sync_version() != (self._version if version is None else version):
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'graph_version': self._version
+            }
+
+
+def cached(method: Callable) -> Callable:
+    """Cache a method's results in `self.cache`, keyed on its arguments.
+
+    Cached results are shared between callers and must be treated as read-only.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        version = self.cache.version_fn()
+        value = method(self, *args, **kwargs)
+        self.cache.set(key, value, version)
+        return value
+    return wrapper
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Precomputed Constellation Table for Context Engine
+
+Holds the pattern x archetype (SUITED_FOR strength), pattern x stage
+(APPLIES_AT importance) and pattern x domain (RELEVANT_FOR specificity)
+facets as dense NumPy matrices, and the ranked pattern list for every
+(archetype, stage or *, domain or *) combination. A constellation request
+is then a mask over a precomputed ranking instead of up to three MATCH
+clauses and a sort.
+
+Blended requests (weights over several archetypes, stages and domains) are
+scored for every pattern at once with one matrix-vector product per facet
+against zero-filled copies of the same matrices.
+
+Rankings follow the API: patterns that have every requested facet, scored
+strength * importance (strength alone without a stage), highest first, ties
+by pattern id.
+
+Usage:
+    python src/retrieval/constellations.py Startup --stage Validation --domain Finance
+    python src/retrieval/constellations.py Cooperative:0.6,Network:0.4 --stage Growth,Expansion
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection, get_graph_version
+
+WILDCARD = -1
+
+
+def _table_names(conn) -> set[str]:
+    result = conn.execute("CALL show_tables() RETURN name")
+    names = set()
+    while result.has_next():
+        names.add(result.get_next()[0])
+    return names
+
+
+class ConstellationTable:
+    """Dense context facets plus a ranking per (archetype, stage, domain)."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, archetypes: list[str],
+                 stages: list[str], domains: list[str], strength: np.ndarray,
+                 importance: np.ndarray, specificity: np.ndarray,
+                 specificity_levels: list[str], stage_sequences: Optional[list[int]] = None,
+                 version: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.archetypes = archetypes
+        self.stages = stages
+        self.domains = domains
+        self.strength = strength          # n x archetypes, NaN where no SUITED_FOR
+        self.importance = importance      # n x stages, NaN where no APPLIES_AT
+        self.specificity = specificity    # n x domains, level code or -1
+        self.specificity_levels = specificity_levels
+        self.stage_sequences = stage_sequences or list(range(1, len(stages) + 1))
+        self.version = version
+        self.archetype_index = {name: i for i, name in enumerate(archetypes)}
+        self.stage_index = {name: i for i, name in enumerate(stages)}
+        self.domain_index = {name: i for i, name in enumerate(domains)}
+        self.rankings = self._rank_all()
+        # Zero-filled values and 0/1 presence for blended matrix-vector scoring
+        self._suited = (~np.isnan(strength)).astype(np.float64)
+        self._applies = (~np.isnan(importance)).astype(np.float64)
+        self._relevant = (specificity >= 0).astype(np.float64)
+        self._strength = np.nan_to_num(strength)
+        self._importance = np.nan_to_num(importance)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def is_stale(self) -> bool:
+        return get_graph_version() != self.version
+
+    @classmethod
+    def load(cls, conn=None) -> "ConstellationTable":
+        """Build the table from the Kuzu graph."""
+        if conn is None:
+            db, conn = get_connection()
+        version = get_graph_version()
+        tables = _table_names(conn)
+
+        ids, titles = [], []
+        result = conn.execute('MATCH (p:Pattern) RETURN p.id, p.title ORDER BY p.id')
+        while result.has_next():
+            row = result.get_next()
+            ids.append(row[0])
+            titles.append(row[1] or '')
+        index = {pid: i for i, pid in enumerate(ids)}
+
+        def names(label: str, columns: str = 'n.name') -> list:
+            if label not in tables:
+                return []
+            result = conn.execute(f'MATCH (n:{label}) RETURN {columns} ORDER BY {columns}')
+            values = []
+            while result.has_next():
+                row = result.get_next()
+                values.append(row[0] if len(row) == 1 else row)
+            return values
+
+        def edges(rel_type: str, label: str, prop: str) -> list[tuple]:
+            if rel_type not in tables or label not in tables:
+                return []
+            result = conn.execute(f'''
+                MATCH (p:Pattern)-[r:{rel_type}]->(n:{label})
+                RETURN p.id, n.name, r.{prop}
+            ''')
+            rows = []
+            while result.has_next():
+                rows.append(result.get_next())
+            return rows
+
+        archetypes = names('Archetype')
+        stage_rows = names('Stage', 'n.sequence, n.name')
+        stages = [name for _, name in stage_rows]
+        domains = names('Domain')
+        archetype_index = {name: i for i, name in enumerate(archetypes)}
+        stage_index = {name: i for i, name in enumerate(stages)}
+        domain_index = {name: i for i, name in enumerate(domains)}
+
+        strength = np.full((len(ids), len(archetypes)), np.nan)
+        for pid, name, value in edges('SUITED_FOR', 'Archetype', 'strength'):
+            if pid in index and value is not None:
+                strength[index[pid], archetype_index[name]] = value
+
+        importance = np.full((len(ids), len(stages)), np.nan)
+        for pid, name, value in edges('APPLIES_AT', 'Stage', 'importance'):
+            if pid in index and value is not None:
+                importance[index[pid], stage_index[name]] = value
+
+        levels: list[str] = []
+        specificity = np.full((len(ids), len(domains)), -1, dtype=np.int8)
+        for pid, name, value in edges('RELEVANT_FOR', 'Domain', 'specificity'):
+            if pid not in index:
+                continue
+            if value not in levels:
+                levels.append(value)
+            specificity[index[pid], domain_index[name]] = levels.index(value)
+
+        return cls(np.array(ids), np.array(titles), archetypes, stages, domains,
+                   strength, importance, specificity, levels,
+                   [sequence for sequence, _ in stage_rows], version)
+
+    def _rank(self, archetype: int, stage: int, domain: int) -> np.ndarray:
+        strength = self.strength[:, archetype]
+        mask = ~np.isnan(strength)
+        score = strength
+        if stage != WILDCARD:
+            importance = self.importance[:, stage]
+            mask &= ~np.isnan(importance)
+            score = score * importance
+        if domain != WILDCARD:
+            mask &= self.specificity[:, domain] >= 0
+        rows = np.flatnonzero(mask)
+        return rows[np.lexsort((rows, -score[rows]))].astype(np.int32)
+
+    def _rank_all(self) -> dict[tuple[int, int, int], np.ndarray]:
+        """Rankings for every archetype x (stage | *) x (domain | *)."""
+        rankings = {}
+        for a in range(len(self.archetypes)):
+            for s in [WILDCARD, *range(len(self.stages))]:
+                for d in [WILDCARD, *range(len(self.domains))]:
+                    rankings[a, s, d] = self._rank(a, s, d)
+        return rankings
+
+    def ranking(self, archetype: str, stage: Optional[str] = None,
+                domain: Optional[str] = None) -> Optional[tuple[np.ndarray, tuple[int, int, int]]]:
+        """Ranked pattern rows and facet indices for a context; None if a name is unknown."""
+        a = self.archetype_index.get(archetype)
+        s = self.stage_index.get(stage) if stage else WILDCARD
+        d = self.domain_index.get(domain) if domain else WILDCARD
+        if a is None or s is None or d is None:
+            return None
+        return self.rankings[a, s, d], (a, s, d)
+
+    def scores(self, rows: np.ndarray, a: int, s: int = WILDCARD) -> np.ndarray:
+        """Ranking scores of pattern rows in a context."""
+        scores = self.strength[rows, a]
+        return scores * self.importance[rows, s] if s != WILDCARD else scores
+
+    def after(self, rows: np.ndarray, a: int, s: int, key: tuple[float, str]) -> np.ndarray:
+        """The part of a ranking that comes after a (score, pattern id) keyset cursor."""
+        score, pattern_id = key
+        descending = -self.scores(rows, a, s)
+        lo = np.searchsorted(descending, -score, side='left')
+        hi = np.searchsorted(descending, -score, side='right')
+        # Ties are ordered by row, and rows follow pattern id order
+        boundary = np.searchsorted(self.ids, pattern_id, side='right')
+        return rows[lo + np.searchsorted(rows[lo:hi], boundary, side='left'):]
+
+    def iter_query(self, archetype: str, stage: Optional[str] = None, domain: Optional[str] = None,
+                   min_strength: float = 0.5, limit: Optional[int] = 50,
+                   after: Optional[tuple[float, str]] = None) -> Iterator[dict]:
+        """Yield the top patterns for a context one at a time (see query())."""
+        ranked = self.ranking(archetype, stage, domain)
+        if ranked is None:
+            return
+        rows, (a, s, d) = ranked
+        if after is not None:
+            rows = self.after(rows, a, s, after)
+        rows = rows[self.strength[rows, a] >= min_strength][:limit]
+        for row in rows:
+            yield self.row(row, a, s, d)
+
+    def query(self, archetype: str, stage: Optional[str] = None, domain: Optional[str] = None,
+              min_strength: float = 0.5, limit: Optional[int] = 50,
+              after: Optional[tuple[float, str]] = None) -> list[dict]:
+        """Top patterns for a context with archetype strength >= min_strength.
+
+        `after` is the (score, pattern_id) of the last pattern of the previous
+        page; the page then starts right after it.
+        """
+        return list(self.iter_query(archetype, stage, domain, min_strength, limit, after))
+
+    def query_many(self, contexts: list[dict]) -> list[list[dict]]:
+        """Evaluate several contexts (dicts of query() arguments) in one pass.
+
+        Contexts are grouped by archetype so each archetype's min_strength
+        mask is computed once and shared by every stage/domain under it.
+        """
+        results: list[list[dict]] = [[] for _ in contexts]
+        masks: dict[tuple[int, float], np.ndarray] = {}
+        for i, context in enumerate(contexts):
+            ranked = self.ranking(context['archetype'], context.get('stage'), context.get('domain'))
+            if ranked is None:
+                continue
+            rows, (a, s, d) = ranked
+            if context.get('after') is not None:
+                rows = self.after(rows, a, s, context['after'])
+            min_strength = context.get('min_strength', 0.5)
+            mask = masks.get((a, min_strength))
+            if mask is None:
+                mask = masks[a, min_strength] = self.strength[:, a] >= min_strength
+            rows = rows[mask[rows]][:context.get('limit', 50)]
+            results[i] = [self.row(row, a, s, d) for row in rows]
+        return results
+
+    @staticmethod
+    def _weights(index: dict[str, int], weights: dict[str, float]) -> np.ndarray:
+        """Weight vector over a facet's columns, summing to 1; all zero if no name is known."""
+        vector = np.zeros(len(index))
+        for name, weight in weights.items():
+            if name in index and weight > 0:
+                vector[index[name]] += weight
+        total = vector.sum()
+        return vector / total if total > 0 else vector
+
+    def iter_blend(self, archetypes: dict[str, float], stages: Optional[dict[str, float]] = None,
+                   domains: Optional[dict[str, float]] = None, min_strength: float = 0.5,
+                   limit: Optional[int] = 50, after: Optional[tuple[float, str]] = None) -> Iterator[dict]:
+        """Yield the top patterns for a weighted blend of contexts (see blend())."""
+        wa = self._weights(self.archetype_index, archetypes)
+        ws = self._weights(self.stage_index, stages) if stages else None
+        wd = self._weights(self.domain_index, domains) if domains else None
+        if not wa.any() or (ws is not None and not ws.any()) or (wd is not None and not wd.any()):
+            return
+
+        strength = self._strength @ wa
+        mask = (self._suited @ wa > 0) & (strength >= min_strength)
+        score = strength
+        importance = None
+        if ws is not None:
+            importance = self._importance @ ws
+            mask &= self._applies @ ws > 0
+            score = score * importance
+        if wd is not None:
+            relevance = self._relevant @ wd
+            mask &= relevance > 0
+            score = score * relevance
+
+        rows = np.flatnonzero(mask)
+        if after is not None:
+            last_score, last_id = after
+            rows = rows[(score[rows] < last_score) |
+                        ((score[rows] == last_score) & (self.ids[rows] > last_id))]
+        rows = rows[np.lexsort((rows, -score[rows]))][:limit]
+
+        # Report the specificity of the most heavily weighted requested domain
+        domain_order = [d for d in np.argsort(-wd, kind='stable') if wd[d] > 0] if wd is not None else []
+        for row in rows:
+            codes = [self.specificity[row, d] for d in domain_order if self.specificity[row, d] >= 0]
+            yield {
+                'pattern_id': str(self.ids[row]),
+                'title': str(self.titles[row]),
+                'strength': float(strength[row]),
+                'importance': float(importance[row]) if importance is not None else None,
+                'specificity': self.specificity_levels[codes[0]] if codes else None,
+                'score': float(score[row])
+            }
+
+    def blend(self, archetypes: dict[str, float], stages: Optional[dict[str, float]] = None,
+              domains: Optional[dict[str, float]] = None, min_strength: float = 0.5,
+              limit: Optional[int] = 50, after: Optional[tuple[float, str]] = None) -> list[dict]:
+        """Top patterns for a weighted blend of archetypes, stages and domains.
+
+        Weights are normalized per facet and unknown names are ignored. A
+        pattern qualifies if it is suited to one of the archetypes with a
+        weighted strength >= min_strength, applies at one of the stages and
+        is relevant to one of the domains. Its score is the weighted
+        strength times the weighted importance times the weighted share of
+        domains it is relevant to, so a single-context blend ranks exactly
+        like query().
+        """
+        return list(self.iter_blend(archetypes, stages, domains, min_strength, limit, after))
+
+    def row(self, row: int, a: int, s: int = WILDCARD, d: int = WILDCARD) -> dict:
+        """One constellation entry for a pattern row in a context."""
+        strength = float(self.strength[row, a])
+        importance = float(self.importance[row, s]) if s != WILDCARD else None
+        return {
+            'pattern_id': str(self.ids[row]),
+            'title': str(self.titles[row]),
+            'strength': strength,
+            'importance': importance,
+            'specificity': self.specificity_levels[self.specificity[row, d]] if d != WILDCARD else None,
+            'score': strength * importance if s != WILDCARD else strength
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the precomputed constellation table")
+    parser.add_argument("archetype", help="Archetype, or a blend like Cooperative:0.6,Network:0.4")
+    parser.add_argument("--stage", help="Stage, or a blend like Growth,Expansion")
+    parser.add_argument("--domain", help="Domain, or a blend like Finance:2,Technology")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    def weights(spec: Optional[str]) -> Optional[dict[str, float]]:
+        if spec is None:
+            return None
+        parts = [part.rsplit(':', 1) for part in spec.split(',')]
+        return {p[0]: float(p[1]) if len(p) == 2 else 1.0 for p in parts}
+
+    start = time.perf_counter()
+    table = ConstellationTable.load()
+    print(f"✓ {len(table)} patterns, {len(table.rankings)} rankings "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    if any(spec and (',' in spec or ':' in spec) for spec in [args.archetype, args.stage, args.domain]):
+        patterns = table.blend(weights(args.archetype), weights(args.stage), weights(args.domain),
+                               limit=args.limit)
+    else:
+        patterns = table.query(args.archetype, args.stage, args.domain, limit=args.limit)
+    print(f"\n{args.archetype} / {args.stage or '*'} / {args.domain or '*'} "
+          f"({(time.perf_counter() - start) * 1e6:.0f} µs):")
+    for p in patterns:
+        print(f"  {p['score']:.3f}  {p['title']}")
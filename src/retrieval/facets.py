@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Facet Catalogs for Context Engine
+
+Archetype, stage and domain catalogs (pattern counts, average weights,
+weight histograms and co-occurrence counts) computed once per graph version
+from the dense facet matrices of a ConstellationTable. Co-occurrences are
+boolean matrix products, e.g. archetype x stage = patterns having both.
+
+Usage:
+    python src/retrieval/facets.py
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from retrieval.constellations import ConstellationTable
+
+# Ten equal-width bins over [0, 1] for strength and importance histograms
+HISTOGRAM_EDGES = np.linspace(0.0, 1.0, 11)
+
+
+def _histogram(values: np.ndarray) -> list[int]:
+    counts, _ = np.histogram(values[~np.isnan(values)], bins=HISTOGRAM_EDGES)
+    return counts.tolist()
+
+
+def _cooccurrence(names: list[str], counts: np.ndarray) -> dict[str, int]:
+    return {name: int(count) for name, count in zip(names, counts) if count}
+
+
+@dataclass
+class FacetCatalogs:
+    """Per-facet summaries for one graph version."""
+    archetypes: list[dict]
+    stages: list[dict]
+    domains: list[dict]
+    version: int = 0
+
+    @classmethod
+    def from_table(cls, table: ConstellationTable) -> "FacetCatalogs":
+        suited = ~np.isnan(table.strength)
+        applies = ~np.isnan(table.importance)
+        relevant = table.specificity >= 0
+
+        # Patterns sharing each pair of facet values
+        archetype_stage = suited.T.astype(np.int64) @ applies
+        archetype_domain = suited.T.astype(np.int64) @ relevant
+        stage_domain = applies.T.astype(np.int64) @ relevant
+
+        archetypes = []
+        for a, name in enumerate(table.archetypes):
+            column = table.strength[:, a]
+            count = int(suited[:, a].sum())
+            if not count:
+                continue
+            archetypes.append({
+                'name': name,
+                'pattern_count': count,
+                'avg_strength': float(np.nanmean(column)),
+                'strength_histogram': _histogram(column),
+                'stages': _cooccurrence(table.stages, archetype_stage[a]),
+                'domains': _cooccurrence(table.domains, archetype_domain[a])
+            })
+        archetypes.sort(key=lambda f: (-f['pattern_count'], f['name']))
+
+        stages = []
+        for s, name in enumerate(table.stages):
+            column = table.importance[:, s]
+            count = int(applies[:, s].sum())
+            if not count:
+                continue
+            stages.append({
+                'name': name,
+                'sequence': table.stage_sequences[s],
+                'pattern_count': count,
+                'avg_importance': float(np.nanmean(column)),
+                'importance_histogram': _histogram(column),
+                'archetypes': _cooccurrence(table.archetypes, archetype_stage[:, s]),
+                'domains': _cooccurrence(table.domains, stage_domain[s])
+            })
+
+        domains = []
+        for d, name in enumerate(table.domains):
+            codes = table.specificity[:, d]
+            count = int(relevant[:, d].sum())
+            if not count:
+                continue
+            levels = np.bincount(codes[codes >= 0], minlength=len(table.specificity_levels))
+            domains.append({
+                'name': name,
+                'pattern_count': count,
+                'specificity': _cooccurrence(table.specificity_levels, levels),
+                'archetypes': _cooccurrence(table.archetypes, archetype_domain[:, d]),
+                'stages': _cooccurrence(table.stages, stage_domain[:, d])
+            })
+        domains.sort(key=lambda f: (-f['pattern_count'], f['name']))
+
+        return cls(archetypes, stages, domains, table.version)
+
+
+if __name__ == "__main__":
+    table = ConstellationTable.load()
+    start = time.perf_counter()
+    catalogs = FacetCatalogs.from_table(table)
+    print(f"✓ Facet catalogs for graph v{catalogs.version} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for facet in ['archetypes', 'stages', 'domains']:
+        print(f"\n{facet.title()}:")
+        for f in getattr(catalogs, facet):
+            print(f"  {f['pattern_count']:5}  {f['name']}")
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+In-Memory Adjacency Snapshot of the Pattern Graph
+
+The Pattern-to-Pattern graph (ENABLES, REQUIRES, TENSIONS_WITH) is only a few
+thousand edges, so it is loaded once from Kuzu into CSR arrays per
+relationship type. Neighbor lookups, degree counts and k-hop expansion then
+run in NumPy without a database round trip.
+
+The snapshot records the graph version it was built from; callers rebuild it
+when get_graph_version() moves on (the loaders bump it after each run).
+"""
+
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection, get_graph_version, get_rel_properties
+
+REL_TYPES = ('ENABLES', 'REQUIRES', 'TENSIONS_WITH')
+
+# Relative weight of each relationship type in random-walk ranking
+RANK_REL_WEIGHTS = {'ENABLES': 1.0, 'REQUIRES': 1.0, 'TENSIONS_WITH': 0.5}
+DEFAULT_EDGE_WEIGHT = 0.5
+
+
+@dataclass
+class CSRAdjacency:
+    """Compressed sparse rows for one relationship type and direction."""
+    offsets: np.ndarray      # int64, n_nodes + 1
+    targets: np.ndarray      # int32, n_edges
+    strength: np.ndarray     # float32, n_edges (NaN where missing)
+    confidence: np.ndarray   # float32, n_edges (NaN where missing)
+
+    @classmethod
+    def from_edges(cls, n_nodes: int, sources: np.ndarray, targets: np.ndarray,
+                   strength: np.ndarray, confidence: np.ndarray) -> "CSRAdjacency":
+        order = np.argsort(sources, kind='stable')
+        counts = np.bincount(sources, minlength=n_nodes)
+        offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(offsets, targets[order].astype(np.int32),
+                   strength[order], confidence[order])
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def edges_of(self, nodes: np.ndarray) -> np.ndarray:
+        """Edge positions for all rows in `nodes`, concatenated."""
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Start of each row's run, repeated per edge, plus position within run
+        run_starts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return run_starts + np.arange(total)
+
+
+def _weight(value: np.float32) -> Optional[float]:
+    """Edge weight as a Python float (None if missing), without float32 noise."""
+    return None if np.isnan(value) else round(float(value), 6)
+
+
+class GraphSnapshot:
+    """Immutable CSR snapshot of the Pattern-to-Pattern relationships."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray,
+                 out_edges: dict[str, CSRAdjacency], in_edges: dict[str, CSRAdjacency],
+                 version: int):
+        self.ids = ids
+        self.titles = titles
+        self.out_edges = out_edges
+        self.in_edges = in_edges
+        self.version = version
+        self._transitions: dict[tuple, tuple] = {}
+        self.index = {pid: i for i, pid in enumerate(ids.tolist())}
+        self.title_index: dict[str, list[int]] = {}
+        for i, title in enumerate(titles.tolist()):
+            self.title_index.setdefault(title, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, conn=None) -> "GraphSnapshot":
+        """Build a snapshot from the Kuzu graph."""
+        if conn is None:
+            db, conn = get_connection()
+        version = get_graph_version()
+
+        ids, titles = [], []
+        result = conn.execute('MATCH (p:Pattern) RETURN p.id, p.title ORDER BY p.id')
+        while result.has_next():
+            row = result.get_next()
+            ids.append(row[0])
+            titles.append(row[1] or '')
+        index = {pid: i for i, pid in enumerate(ids)}
+        n = len(ids)
+
+        out_edges, in_edges = {}, {}
+        for rel_type in REL_TYPES:
+            properties = get_rel_properties(conn, rel_type)
+            sources, targets, strength, confidence = [], [], [], []
+            if properties:  # empty when the table doesn't exist
+                strength_col = 'r.strength' if 'strength' in properties else 'null'
+                confidence_col = 'r.confidence' if 'confidence' in properties else 'null'
+                result = conn.execute(f'''
+                    MATCH (s:Pattern)-[r:{rel_type}]->(t:Pattern)
+                    RETURN s.id, t.id, {strength_col}, {confidence_col}
+                ''')
+                while result.has_next():
+                    row = result.get_next()
+                    sources.append(index[row[0]])
+                    targets.append(index[row[1]])
+                    strength.append(np.nan if row[2] is None else row[2])
+                    confidence.append(np.nan if row[3] is None else row[3])
+
+            src = np.array(sources, dtype=np.int64)
+            dst = np.array(targets, dtype=np.int64)
+            s = np.array(strength, dtype=np.float32)
+            c = np.array(confidence, dtype=np.float32)
+            out_edges[rel_type] = CSRAdjacency.from_edges(n, src, dst, s, c)
+            in_edges[rel_type] = CSRAdjacency.from_edges(n, dst, src, s, c)
+
+        return cls(np.array(ids), np.array(titles), out_edges, in_edges, version)
+
+    def is_stale(self) -> bool:
+        """True once the loaders have modified the graph since this snapshot."""
+        return get_graph_version() != self.version
+
+    def _adjacencies(self, rel_types: Optional[Iterable[str]], direction: str):
+        rel_types = REL_TYPES if rel_types is None else rel_types
+        for rel_type in rel_types:
+            if direction in ('out', 'both'):
+                yield rel_type, 'out', self.out_edges[rel_type]
+            if direction in ('in', 'both'):
+                yield rel_type, 'in', self.in_edges[rel_type]
+
+    def neighbors(self, pattern_id: str, rel_types: Optional[Iterable[str]] = None,
+                  direction: str = 'out') -> list[dict]:
+        """Direct neighbors of a pattern."""
+        node = self.index.get(pattern_id)
+        if node is None:
+            return []
+
+        neighbors = []
+        nodes = np.array([node])
+        for rel_type, rel_direction, csr in self._adjacencies(rel_types, direction):
+            for e in csr.edges_of(nodes):
+                t = csr.targets[e]
+                neighbors.append({
+                    'pattern_id': str(self.ids[t]),
+                    'title': str(self.titles[t]),
+                    'relationship': rel_type,
+                    'direction': rel_direction,
+                    'strength': _weight(csr.strength[e]),
+                    'confidence': _weight(csr.confidence[e])
+                })
+        return neighbors
+
+    def degree(self, rel_types: Optional[Iterable[str]] = None,
+               direction: str = 'both') -> np.ndarray:
+        """Degree of every node (aligned with self.ids)."""
+        degree = np.zeros(len(self), dtype=np.int64)
+        for _, _, csr in self._adjacencies(rel_types, direction):
+            degree += csr.degree()
+        return degree
+
+    def edge_weights(self, csr: CSRAdjacency, weight: str = 'strength') -> np.ndarray:
+        """Per-edge weight from 'strength' or 'confidence', falling back to the other."""
+        primary, fallback = (csr.strength, csr.confidence) if weight == 'strength' \
+            else (csr.confidence, csr.strength)
+        weights = np.where(np.isnan(primary), fallback, primary)
+        return np.nan_to_num(weights, nan=DEFAULT_EDGE_WEIGHT)
+
+    def transitions(self, weight: str = 'strength', direction: str = 'both',
+                    rel_weights: Optional[dict[str, float]] = None) -> tuple:
+        """Row-normalized random-walk transitions as (sources, targets, probs, dangling)."""
+        rel_weights = rel_weights or RANK_REL_WEIGHTS
+        key = (weight, direction, tuple(sorted(rel_weights.items())))
+        if key not in self._transitions:
+            sources, targets, weights = [], [], []
+            for rel_type, _, csr in self._adjacencies(list(rel_weights), direction):
+                sources.append(np.repeat(np.arange(len(self)), csr.degree()))
+                targets.append(csr.targets)
+                weights.append(self.edge_weights(csr, weight) * rel_weights[rel_type])
+            src = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+            dst = np.concatenate(targets).astype(np.int64) if targets else np.empty(0, dtype=np.int64)
+            w = np.concatenate(weights).astype(np.float64) if weights else np.empty(0)
+
+            out_weight = np.bincount(src, weights=w, minlength=len(self))
+            probs = w / out_weight[src] if len(w) else w
+            dangling = out_weight == 0
+            self._transitions[key] = (src, dst, probs, dangling)
+        return self._transitions[key]
+
+    def personalized_pagerank(self, seeds, alpha: float = 0.85, weight: str = 'strength',
+                              direction: str = 'both', tol: float = 1e-6,
+                              max_iter: int = 100) -> np.ndarray:
+        """Random walk with restart to `seeds` (IDs, or a dict of ID -> weight).
+        
+        Runs a sparse power iteration over the relationship edges until the
+        L1 change drops below `tol`. With no known seeds this is global PageRank.
+        Returns a score per node, aligned with self.ids.
+        """
+        n = len(self)
+        restart = np.zeros(n)
+        if isinstance(seeds, dict):
+            for pid, w in seeds.items():
+                if pid in self.index:
+                    restart[self.index[pid]] += w
+        else:
+            for pid in seeds:
+                if pid in self.index:
+                    restart[self.index[pid]] += 1.0
+        total = restart.sum()
+        restart = restart / total if total > 0 else np.full(n, 1.0 / max(n, 1))
+
+        src, dst, probs, dangling = self.transitions(weight, direction)
+        scores = restart.copy()
+        for _ in range(max_iter):
+            spread = np.bincount(dst, weights=scores[src] * probs, minlength=n)
+            leaked = scores[dangling].sum()
+            updated = alpha * spread + (alpha * leaked + 1 - alpha) * restart
+            delta = np.abs(updated - scores).sum()
+            scores = updated
+            if delta < tol:
+                break
+        return scores
+
+    def beam_expand(self, pattern_id: str, hops: int = 3, beam: int = 32,
+                    weight: str = 'strength', rel_types: Optional[Iterable[str]] = None,
+                    direction: str = 'out') -> list[dict]:
+        """Multi-hop expansion scoring each path by the product of its edge weights.
+        
+        Only the `beam` best frontier paths are expanded at each hop, so cost
+        is bounded by hops * beam * max_degree regardless of how the graph
+        fans out. Returns every reached pattern with its best path, best first.
+        """
+        start = self.index.get(pattern_id)
+        if start is None:
+            return []
+
+        adjacencies = list(self._adjacencies(rel_types, direction))
+        edge_weights = [self.edge_weights(csr, weight) for _, _, csr in adjacencies]
+
+        best = np.zeros(len(self))
+        best[start] = 1.0
+        reached: dict[int, tuple[float, list]] = {}
+        frontier = np.array([start], dtype=np.int64)
+        frontier_scores = np.array([1.0])
+        frontier_paths: list[list] = [[]]
+
+        for hop in range(1, hops + 1):
+            owners, targets, scores, steps, step_kinds = [], [], [], [], []
+            for (rel_type, rel_direction, csr), weights in zip(adjacencies, edge_weights):
+                edges = csr.edges_of(frontier)
+                if not len(edges):
+                    continue
+                counts = csr.offsets[frontier + 1] - csr.offsets[frontier]
+                owner = np.repeat(np.arange(len(frontier)), counts)
+                owners.append(owner)
+                targets.append(csr.targets[edges].astype(np.int64))
+                scores.append(frontier_scores[owner] * weights[edges])
+                steps.append(np.full(len(edges), len(step_kinds)))
+                step_kinds.append((rel_type, rel_direction))
+            if not owners:
+                break
+
+            owner = np.concatenate(owners)
+            target = np.concatenate(targets)
+            score = np.concatenate(scores)
+            step = np.concatenate(steps)
+
+            # Best candidate per target, keeping only improvements
+            order = np.argsort(-score, kind='stable')
+            _, first = np.unique(target[order], return_index=True)
+            candidates = order[first]
+            candidates = candidates[score[candidates] > best[target[candidates]]]
+            candidates = candidates[np.argsort(-score[candidates], kind='stable')]
+
+            next_nodes, next_scores, next_paths = [], [], []
+            for c in candidates:
+                if len(next_nodes) >= beam:
+                    break
+                t, o = int(target[c]), int(owner[c])
+                path = frontier_paths[o]
+                if any(prev == t for prev, _, _ in path):
+                    continue
+                rel_type, rel_direction = step_kinds[step[c]]
+                path = path + [(t, rel_type, rel_direction)]
+                best[t] = score[c]
+                reached[t] = (float(score[c]), path)
+                next_nodes.append(t)
+                next_scores.append(score[c])
+                next_paths.append(path)
+
+            if not next_nodes:
+                break
+            frontier = np.array(next_nodes, dtype=np.int64)
+            frontier_scores = np.array(next_scores)
+            frontier_paths = next_paths
+
+        results = []
+        for node, (score, path) in reached.items():
+            results.append({
+                'pattern_id': str(self.ids[node]),
+                'title': str(self.titles[node]),
+                'score': round(score, 6),
+                'hops': len(path),
+                'path': [
+                    {'pattern_id': str(self.ids[t]), 'title': str(self.titles[t]),
+                     'relationship': rel_type, 'direction': rel_direction}
+                    for t, rel_type, rel_direction in path
+                ]
+            })
+        results.sort(key=lambda r: (-r['score'], r['hops']))
+        return results
+
+    def approximate_betweenness(self, samples: int = 256, seed: int = 0,
+                                rel_types: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Betweenness centrality estimated from `samples` BFS sources (Brandes).
+        
+        Treats relationships as undirected and unweighted; scores are scaled
+        up from the sampled sources to approximate the exact values.
+        """
+        n = len(self)
+        if not n:
+            return np.zeros(0)
+        neighbors: list[list[int]] = [[] for _ in range(n)]
+        for _, _, csr in self._adjacencies(rel_types, 'both'):
+            for node, degree in enumerate(csr.degree()):
+                if degree:
+                    start = csr.offsets[node]
+                    neighbors[node].extend(csr.targets[start:start + degree].tolist())
+
+        connected = [i for i in range(n) if neighbors[i]]
+        rng = np.random.default_rng(seed)
+        sources = connected if len(connected) <= samples else \
+            rng.choice(connected, size=samples, replace=False).tolist()
+
+        centrality = np.zeros(n)
+        for source in sources:
+            order, preds = [], {source: []}
+            sigma = {source: 1.0}
+            dist = {source: 0}
+            queue = [source]
+            for v in queue:
+                order.append(v)
+                for w in neighbors[v]:
+                    if w not in dist:
+                        dist[w] = dist[v] + 1
+                        queue.append(w)
+                        sigma[w] = 0.0
+                        preds[w] = []
+                    if dist[w] == dist[v] + 1:
+                        sigma[w] += sigma[v]
+                        preds[w].append(v)
+            delta = dict.fromkeys(order, 0.0)
+            for w in reversed(order):
+                for v in preds[w]:
+                    delta[v] += sigma[v] / sigma[w] * (1 + delta[w])
+                if w != source:
+                    centrality[w] += delta[w]
+
+        # Undirected paths are counted from both ends
+        scale = len(connected) / max(len(sources), 1) / 2
+        return centrality * scale
+
+    def k_hop(self, pattern_ids: Iterable[str], k: int = 2,
+              rel_types: Optional[Iterable[str]] = None,
+              direction: str = 'both') -> dict[str, int]:
+        """Patterns reachable within k hops, mapped to their hop distance."""
+        seeds = [self.index[pid] for pid in pattern_ids if pid in self.index]
+        hops = np.full(len(self), -1, dtype=np.int64)
+        if not seeds:
+            return {}
+        frontier = np.unique(np.array(seeds, dtype=np.int64))
+        hops[frontier] = 0
+
+        adjacencies = [csr for _, _, csr in self._adjacencies(rel_types, direction)]
+        for hop in range(1, k + 1):
+            reached = [csr.targets[csr.edges_of(frontier)] for csr in adjacencies]
+            candidates = np.unique(np.concatenate(reached)) if reached else np.empty(0, dtype=np.int64)
+            frontier = candidates[hops[candidates] < 0]
+            if not len(frontier):
+                break
+            hops[frontier] = hop
+
+        found = np.flatnonzero(hops >= 0)
+        return {str(self.ids[i]): int(hops[i]) for i in found}
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    snapshot = GraphSnapshot.load()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✓ Snapshot v{snapshot.version}: {len(snapshot)} patterns in {elapsed:.0f} ms")
+    for rel_type in REL_TYPES:
+        print(f"  {rel_type}: {len(snapshot.out_edges[rel_type].targets)} edges")
+
+    degree = snapshot.degree()
+    top = np.argsort(-degree)[:5]
+    print("\nHighest degree:")
+    for i in top:
+        print(f"  {degree[i]:3}  {snapshot.titles[i]}")
@@ -9,61 +9,329 @@ Author: higgerix
 Date: 2026-02-02
 """
 
+import copy
 import json
+import logging
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import kuzu
+import numpy as np
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from db.init_kuzu import get_connection
+from db.compute_metrics import check_metric, load_metrics, top_patterns
+from db.init_kuzu import get_connection, get_content_version, get_graph_version
+from db.statements import register, run
+from retrieval.cache import VersionedCache, cached
+from retrieval.bm25_index import BM25Index
+from retrieval.bm25_index import INDEX_FILE as BM25_INDEX_FILE
+from retrieval.graph_snapshot import GraphSnapshot
+from retrieval.trigram_index import TrigramIndex
+from retrieval.typeahead import TypeaheadIndex, build_typeahead_index
+from retrieval.vector_index import EmbeddingIndex, INDEX_FILE
 
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
+# Pattern-to-Pattern relationships followed by graph_neighbors
+NEIGHBOR_REL_TYPES = ['ENABLES', 'REQUIRES', 'TENSIONS_WITH']
+
+# Parameterized statements, prepared once per connection (see db/statements.py)
+PATTERN_INFO = register('pattern_info', 'MATCH (p:Pattern {id: $id}) RETURN p.title, p.summary')
+TITLE_CONTAINS = register('title_contains', '''
+    MATCH (p:Pattern)
+    WHERE lower(p.title) CONTAINS $query
+    RETURN p.id, p.title, p.summary
+    LIMIT $limit
+''')
+PATTERN_SUMMARIES = register('pattern_summaries', 'MATCH (p:Pattern) WHERE p.id IN $ids RETURN p.id, p.summary')
+RELATIONSHIP_COUNTS = {
+    rel_type: register(f'count_{rel_type.lower()}', f'MATCH ()-[r:{rel_type}]->() RETURN COUNT(r)')
+    for rel_type in NEIGHBOR_REL_TYPES
+}
+MOST_CONNECTED = register('most_connected', '''
+    MATCH (p:Pattern)-[r]-()
+    RETURN p.id, p.title, COUNT(r) as connections
+    ORDER BY connections DESC
+    LIMIT $limit
+''')
+
+# Candidate generators fused by hybrid_search, with their default weights
+FUSION_WEIGHTS = {'keyword': 1.0, 'semantic': 1.0, 'graph': 0.5}
+RRF_K = 60
+
+logger = logging.getLogger(__name__)
+
+
+def _file_stamp(path: Path) -> Optional[tuple[int, int]]:
+    """(mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 
 class HybridRetriever:
     """Hybrid retrieval combining vector search and graph traversal."""
     
-    def __init__(self):
-        self.db, self.conn = get_connection()
+    def __init__(self, cache_size: int = 1024, cache_ttl: Optional[float] = None,
+                 db: Optional[kuzu.Database] = None, conn: Optional[kuzu.Connection] = None):
+        if db is None:
+            self.db, self.conn = get_connection()
+        else:
+            self.db, self.conn = db, conn or kuzu.Connection(db)
+        self.cache = VersionedCache(maxsize=cache_size, ttl=cache_ttl)
+        # Lazily loaded indexes, shared with forks (see fork())
+        self._shared: dict[str, object] = {}
+        self._lock = threading.RLock()
     
-    def graph_neighbors(self, pattern_id: str) -> list[dict]:
-        """Get related patterns via graph traversal."""
-        results = []
+    def fork(self, conn: kuzu.Connection) -> "HybridRetriever":
+        """A retriever using another connection but sharing indexes and cache."""
+        clone = copy.copy(self)
+        clone.conn = conn
+        return clone
+    
+    def _resource(self, name: str, is_current, load):
+        """Get a lazily loaded shared resource, reloading it once it is stale."""
+        value = self._shared.get(name)
+        if value is None or not is_current(value):
+            with self._lock:
+                value = self._shared.get(name)
+                if value is None or not is_current(value):
+                    value = load()
+                    self._shared[name] = value
+        return value
+    
+    def _load_text_index(self, name: str, path: Path, load):
+        """Load a saved text index with its file stamp; never builds or writes one.
         
-        for rel_type, direction in [
-            ('ENABLES', 'out'), ('ENABLES', 'in'),
-            ('REQUIRES', 'out'), ('REQUIRES', 'in'),
-            ('TENSIONS_WITH', 'both')
-        ]:
-            try:
-                if direction == 'out':
-                    query = f'MATCH (p:Pattern {{id: "{pattern_id}"}})-[r:{rel_type}]->(t:Pattern) RETURN t.id, t.title, r.strength'
-                    rel_label = rel_type.lower()
-                elif direction == 'in':
-                    query = f'MATCH (s:Pattern)-[r:{rel_type}]->(p:Pattern {{id: "{pattern_id}"}}) RETURN s.id, s.title, r.strength'
-                    rel_label = f'{rel_type.lower()}_by'
+        load_patterns.py (or the index's own CLI) rebuilds it after the pattern
+        text changes, so queries don't pay for a rebuild; until then the saved
+        index keeps being served.
+        """
+        if not path.exists():
+            raise FileNotFoundError(f"No {name} at {path}. Run load_patterns.py to build it.")
+        index = load(path)
+        if index.version != get_content_version():
+            logger.warning("%s was built for pattern content v%d but the graph has v%d; "
+                           "rebuild it with load_patterns.py", path.name, index.version, get_content_version())
+        return _file_stamp(path), index
+    
+    @property
+    def vector_index(self) -> EmbeddingIndex:
+        """Pattern embeddings, reloaded when the saved index file changes."""
+        return self._resource(
+            'vector_index', lambda loaded: loaded[0] == _file_stamp(INDEX_FILE),
+            lambda: self._load_text_index('embedding index', INDEX_FILE, EmbeddingIndex.load)
+        )[1]
+    
+    def vector_search(self, query: str, k: int = 10) -> list[dict]:
+        """Search patterns by semantic similarity of title/summary/content."""
+        return self.vector_index.search(query, k)
+    
+    @property
+    def keyword_index(self) -> BM25Index:
+        """BM25 full-text index, reloaded when the saved index file changes."""
+        return self._resource(
+            'keyword_index', lambda loaded: loaded[0] == _file_stamp(BM25_INDEX_FILE),
+            lambda: self._load_text_index('BM25 index', BM25_INDEX_FILE, BM25Index.load)
+        )[1]
+    
+    def keyword_search(self, query: str, k: int = 10) -> list[dict]:
+        """Search patterns by BM25 over title, summary and content."""
+        return self.keyword_index.search(query, k)
+    
+    @property
+    def snapshot(self) -> GraphSnapshot:
+        """In-memory adjacency snapshot, rebuilt when the graph version changes."""
+        return self._resource('snapshot', lambda snapshot: not snapshot.is_stale(),
+                              lambda: GraphSnapshot.load(self.conn))
+    
+    @property
+    def typeahead_index(self) -> TypeaheadIndex:
+        """Title/slug prefix index, rebuilt when the graph version changes."""
+        return self._resource('typeahead_index', lambda index: not index.is_stale(),
+                              lambda: build_typeahead_index(self.conn, self.snapshot, self.metrics))
+    
+    def autocomplete(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Complete a typed prefix to pattern titles, most central first."""
+        return self.typeahead_index.complete(prefix, limit)
+    
+    @property
+    def trigram_index(self) -> TrigramIndex:
+        """Title trigram index for fuzzy matching, rebuilt with the snapshot."""
+        return self._resource('trigram_index', lambda index: not index.is_stale(),
+                              lambda: TrigramIndex.from_snapshot(self.snapshot))
+    
+    def fuzzy_search(self, query: str, limit: int = 10) -> list[dict]:
+        """Search patterns by trigram similarity of their titles (typo tolerant)."""
+        return self.trigram_index.search(query, limit)
+    
+    def graph_neighbors_many(self, pattern_ids: list[str]) -> dict[str, list[dict]]:
+        """Get related patterns for several patterns at once.
+        
+        Returns a dict mapping every requested pattern ID to its neighbors,
+        ordered ENABLES, ENABLES_BY, REQUIRES, REQUIRES_BY, TENSIONS_WITH.
+        Served from the adjacency snapshot, so no database round trips.
+        """
+        snapshot = self.snapshot
+        grouped = {}
+        for pid in pattern_ids:
+            neighbors = []
+            for n in snapshot.neighbors(pid, NEIGHBOR_REL_TYPES, direction='both'):
+                if n['relationship'] == 'TENSIONS_WITH':
+                    rel_label, strength = 'tensions_with', 0.5
                 else:
-                    query = f'MATCH (p:Pattern {{id: "{pattern_id}"}})-[r:{rel_type}]-(t:Pattern) RETURN t.id, t.title, 0.5'
-                    rel_label = rel_type.lower()
-                
-                result = self.conn.execute(query)
-                while result.has_next():
-                    row = result.get_next()
-                    results.append({
-                        'pattern_id': row[0],
-                        'title': row[1],
-                        'strength': row[2] or 0.5,
-                        'relationship': rel_label
-                    })
-            except:
-                pass
+                    rel_label = n['relationship'].lower()
+                    if n['direction'] == 'in':
+                        rel_label += '_by'
+                    strength = n['strength'] if n['strength'] is not None else n['confidence']
+                neighbors.append({
+                    'pattern_id': n['pattern_id'],
+                    'title': n['title'],
+                    'strength': strength or 0.5,
+                    'relationship': rel_label
+                })
+            grouped[pid] = neighbors
+        return grouped
+    
+    def k_hop_neighbors(self, pattern_id: str, k: int = 2) -> dict[str, int]:
+        """Get patterns within k relationship hops, mapped to their distance."""
+        return self.snapshot.k_hop([pattern_id], k, NEIGHBOR_REL_TYPES)
+    
+    def context_rank(self, seed_ids: list[str], k: int = 10, weight: str = 'strength',
+                     include_seeds: bool = False) -> list[dict]:
+        """Rank patterns by personalized PageRank from a set of seed patterns.
         
-        return results
+        Walks ENABLES/REQUIRES/TENSIONS_WITH edges weighted by `weight`
+        ('strength' or 'confidence'), restarting at the seeds, so patterns
+        several hops away still rank by how strongly they connect back.
+        """
+        snapshot = self.snapshot
+        if not any(pid in snapshot.index for pid in seed_ids):
+            return []
+        scores = snapshot.personalized_pagerank(seed_ids, weight=weight)
+        if not include_seeds:
+            for pid in seed_ids:
+                if pid in snapshot.index:
+                    scores[snapshot.index[pid]] = 0.0
+        
+        candidates = np.flatnonzero(scores > 0)
+        k = min(k, len(candidates))
+        if not k:
+            return []
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {'pattern_id': str(snapshot.ids[i]), 'title': str(snapshot.titles[i]), 'score': float(scores[i])}
+            for i in top
+        ]
+    
+    def expand_paths(self, pattern_id: str, hops: int = 3, beam: int = 32,
+                     weight: str = 'strength', rel_types: Optional[list[str]] = None,
+                     direction: str = 'out', limit: Optional[int] = None) -> list[dict]:
+        """What a pattern leads to within `hops` steps, with the best path to each.
+        
+        Paths are scored by the product of edge strength (or confidence) and
+        only the top `beam` paths are expanded per hop, keeping hub patterns
+        bounded in time and memory.
+        """
+        results = self.snapshot.beam_expand(
+            pattern_id, hops=hops, beam=beam, weight=weight,
+            rel_types=rel_types or NEIGHBOR_REL_TYPES, direction=direction
+        )
+        return results[:limit] if limit else results
+    
+    def _warm(self) -> None:
+        """Load the indexes up front so hybrid_search's generators don't race to load them."""
+        self.keyword_index
+        self.vector_index
+        self.snapshot
     
+    def close(self) -> None:
+        """Shut down the thread pool hybrid_search runs its generators on (shared with forks)."""
+        with self._lock:
+            executor = self._shared.pop('executor', None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    def _graph_candidates(self, query: str, k: int, seeds: int = 5) -> list[dict]:
+        """Graph-proximity candidates: context rank seeded by the top keyword hits."""
+        seed_ids = [hit['pattern_id'] for hit in self.keyword_search(query, seeds)]
+        return self.context_rank(seed_ids, k, include_seeds=True)
+    
+    def hybrid_search(self, query: str, k: int = 10, fusion: str = 'rrf',
+                      weights: Optional[dict[str, float]] = None,
+                      candidates: Optional[int] = None) -> dict:
+        """Search with keyword, semantic and graph-proximity signals fused.
+        
+        The three candidate generators run concurrently and are merged with
+        reciprocal rank fusion ('rrf') or min-max normalized weighted score
+        fusion ('weighted'). Returns the fused results and per-stage timings.
+        """
+        start = time.perf_counter()
+        weights = {**FUSION_WEIGHTS, **(weights or {})}
+        candidates = candidates or max(3 * k, 30)
+        
+        self._warm()
+        executor = self._resource('executor', lambda _: True,
+                                  lambda: ThreadPoolExecutor(max_workers=len(FUSION_WEIGHTS)))
+        
+        def timed(generator, *args):
+            stage_start = time.perf_counter()
+            hits = generator(*args)
+            return hits, (time.perf_counter() - stage_start) * 1000
+        
+        futures = {
+            'keyword': executor.submit(timed, self.keyword_search, query, candidates),
+            'semantic': executor.submit(timed, self.vector_search, query, candidates),
+            'graph': executor.submit(timed, self._graph_candidates, query, candidates),
+        }
+        timings = {}
+        ranked = {}
+        for name, future in futures.items():
+            ranked[name], timings[name] = future.result()
+        
+        fusion_start = time.perf_counter()
+        fused: dict[str, dict] = {}
+        for name, hits in ranked.items():
+            if not hits or not weights.get(name):
+                continue
+            if fusion == 'weighted':
+                scores = [hit['score'] for hit in hits]
+                low, span = min(scores), (max(scores) - min(scores)) or 1.0
+            for rank, hit in enumerate(hits, 1):
+                if fusion == 'weighted':
+                    contribution = weights[name] * (hit['score'] - low) / span
+                else:
+                    contribution = weights[name] / (RRF_K + rank)
+                entry = fused.setdefault(hit['pattern_id'], {
+                    'pattern_id': hit['pattern_id'],
+                    'title': hit['title'],
+                    'score': 0.0,
+                    'ranks': {}
+                })
+                entry['score'] += contribution
+                entry['ranks'][name] = rank
+        
+        results = sorted(fused.values(), key=lambda r: -r['score'])[:k]
+        timings['fusion'] = (time.perf_counter() - fusion_start) * 1000
+        timings['total'] = (time.perf_counter() - start) * 1000
+        return {'query': query, 'fusion': fusion, 'results': results, 'timings_ms': timings}
+    
+    def graph_neighbors(self, pattern_id: str) -> list[dict]:
+        """Get related patterns via graph traversal."""
+        return self.graph_neighbors_many([pattern_id])[pattern_id]
+    
+    @cached
     def get_pattern_info(self, pattern_id: str) -> Optional[dict]:
         """Get pattern information from the graph."""
         try:
-            result = self.conn.execute(f'MATCH (p:Pattern {{id: "{pattern_id}"}}) RETURN p.title, p.summary')
+            result = run(self.conn, PATTERN_INFO, {'id': pattern_id})
             if result.has_next():
                 row = result.get_next()
                 return {'id': pattern_id, 'title': row[0], 'summary': row[1]}
@@ -71,51 +339,92 @@ class HybridRetriever:
             pass
         return None
     
+    @cached
     def search_by_title(self, query: str, limit: int = 10) -> list[dict]:
-        """Search patterns by title."""
+        """Search patterns by title.
+        
+        Case-insensitive substring match; if nothing matches, falls back to
+        fuzzy trigram matching so misspelled titles still resolve.
+        """
         results = []
         try:
-            result = self.conn.execute(f'''
-                MATCH (p:Pattern)
-                WHERE p.title CONTAINS "{query}"
-                RETURN p.id, p.title, p.summary
-                LIMIT {limit}
-            ''')
+            result = run(self.conn, TITLE_CONTAINS, {'query': query.lower(), 'limit': limit})
             while result.has_next():
                 row = result.get_next()
                 results.append({'pattern_id': row[0], 'title': row[1], 'summary': row[2]})
         except:
             pass
-        return results
+        if results:
+            return results
+        
+        fuzzy = self.fuzzy_search(query, limit)
+        if fuzzy:
+            summaries = {}
+            result = run(self.conn, PATTERN_SUMMARIES, {'ids': [hit['pattern_id'] for hit in fuzzy]})
+            while result.has_next():
+                row = result.get_next()
+                summaries[row[0]] = row[1]
+            for hit in fuzzy:
+                hit['summary'] = summaries.get(hit['pattern_id'])
+        return fuzzy
     
+    @property
+    def metrics(self) -> Optional[dict]:
+        """Precomputed pattern metrics (see db/compute_metrics.py), None if stale."""
+        version, metrics = self._resource(
+            'metrics', lambda loaded: loaded[0] == get_graph_version(),
+            lambda: (get_graph_version(), load_metrics())
+        )
+        return metrics
+    
+    @cached
     def get_relationship_stats(self) -> dict:
         """Get statistics about relationships in the graph."""
+        metrics = self.metrics
+        if metrics:
+            counts = metrics['relationship_counts']
+            return {rel_type: counts.get(rel_type, 0) for rel_type in NEIGHBOR_REL_TYPES}
+        
         stats = {}
-        for rel_type in ['ENABLES', 'REQUIRES', 'TENSIONS_WITH']:
+        for rel_type in NEIGHBOR_REL_TYPES:
             try:
-                result = self.conn.execute(f'MATCH ()-[r:{rel_type}]->() RETURN COUNT(r)')
+                result = run(self.conn, RELATIONSHIP_COUNTS[rel_type])
                 if result.has_next():
                     stats[rel_type] = result.get_next()[0]
             except:
                 stats[rel_type] = 0
         return stats
     
+    @cached
     def get_most_connected(self, limit: int = 10) -> list[dict]:
         """Get patterns with most relationships."""
+        metrics = self.metrics
+        if metrics:
+            return [
+                {'pattern_id': p['pattern_id'], 'title': p['title'], 'connections': p['connections']}
+                for p in top_patterns(metrics, 'connections', limit)
+            ]
+        
         results = []
         try:
-            result = self.conn.execute(f'''
-                MATCH (p:Pattern)-[r]-()
-                RETURN p.id, p.title, COUNT(r) as connections
-                ORDER BY connections DESC
-                LIMIT {limit}
-            ''')
+            result = run(self.conn, MOST_CONNECTED, {'limit': limit})
             while result.has_next():
                 row = result.get_next()
                 results.append({'pattern_id': row[0], 'title': row[1], 'connections': row[2]})
         except:
             pass
         return results
+    
+    def get_top_patterns(self, metric: str = 'pagerank', limit: int = 10) -> list[dict]:
+        """Get patterns ranked by a precomputed metric.
+        
+        metric is one of 'connections', 'weighted_degree', 'betweenness' or
+        'pagerank' (anything else raises ValueError). Returns [] until
+        compute_metrics.py has run for this graph.
+        """
+        check_metric(metric)
+        metrics = self.metrics
+        return top_patterns(metrics, metric, limit) if metrics else []
 
 
 def demo():
@@ -144,12 +453,41 @@ def demo():
     print("\n3. Search for 'Lean'")
     print("-" * 40)
     results = retriever.search_by_title("Lean", 5)
+    neighbors_by_id = retriever.graph_neighbors_many([r['pattern_id'] for r in results])
     for r in results:
         print(f"  {r['title']}")
-        neighbors = retriever.graph_neighbors(r['pattern_id'])
+        neighbors = neighbors_by_id[r['pattern_id']]
         if neighbors:
             print(f"    -> {len(neighbors)} related patterns")
     
+    # Typeahead example
+    print("\n4. Autocomplete 'lea'")
+    print("-" * 40)
+    for r in retriever.autocomplete("lea", 5):
+        print(f"  {r['title']}")
+    
+    # Keyword search example
+    print("\n5. Keyword search for 'lean waste reduction'")
+    print("-" * 40)
+    for r in retriever.keyword_search("lean waste reduction", 5):
+        print(f"  {r['score']:6.2f}  {r['title']}")
+    
+    # Semantic search example
+    print("\n6. Semantic search for 'shared ownership of resources'")
+    print("-" * 40)
+    for r in retriever.vector_search("shared ownership of resources", 5):
+        print(f"  {r['score']:.3f}  {r['title']}")
+    
+    # Fused search example
+    print("\n7. Hybrid search for 'lean experimentation'")
+    print("-" * 40)
+    fused = retriever.hybrid_search("lean experimentation", 5)
+    for r in fused['results']:
+        print(f"  {r['score']:.4f}  {r['title']}  {r['ranks']}")
+    timings = ", ".join(f"{stage} {ms:.2f}ms" for stage, ms in fused['timings_ms'].items())
+    print(f"  ({timings})")
+    
+    retriever.close()
     print("\n" + "=" * 60)
 
 
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Pattern Context Similarity for Context Engine
+
+Builds dense pattern x (archetype, stage, domain) feature vectors from the
+archetype extractions (strength, importance, and a weight per specificity
+level) and precomputes each pattern's top-K neighbors by cosine similarity,
+so "shares context with" is a lookup instead of a self-join through the
+Archetype nodes.
+
+Each facet block is L2-normalized on its own before the rows are combined,
+so archetypes, stages and domains count equally however many of each a
+pattern has.
+
+Usage:
+    python src/retrieval/similarity.py                       # build and save
+    python src/retrieval/similarity.py "Lean Startup (Ries)" # build, then query
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+EXTRACTIONS_FILE = DATA_DIR / "archetype_extractions" / "all_extractions.json"
+INDEX_FILE = DATA_DIR / "pattern_similarity.npz"
+
+TOP_K = 100
+CHUNK_ROWS = 1024
+SPECIFICITY_WEIGHTS = {'core': 1.0, 'strong': 0.8, 'specific': 0.8, 'moderate': 0.6, 'general': 0.4}
+FACETS = [('archetypes', 'strength'), ('stages', 'importance'), ('domains', 'specificity')]
+
+
+def _source_stamp(path: Path) -> np.ndarray:
+    stat = path.stat()
+    return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def feature_matrix(extractions: list[dict]) -> tuple[np.ndarray, list[str]]:
+    """Weighted pattern x facet-value matrix and its column names ('facet:name')."""
+    blocks, columns = [], []
+    for facet, weight_key in FACETS:
+        names = sorted({item['name'] for e in extractions for item in e.get(facet, [])})
+        index = {name: i for i, name in enumerate(names)}
+        block = np.zeros((len(extractions), len(names)), dtype=np.float32)
+        for row, e in enumerate(extractions):
+            for item in e.get(facet, []):
+                value = item.get(weight_key)
+                if facet == 'domains':
+                    value = SPECIFICITY_WEIGHTS.get(value, 0.5)
+                block[row, index[item['name']]] = max(block[row, index[item['name']]], value or 0.0)
+        blocks.append(_normalize_rows(block))
+        columns += [f"{facet}:{name}" for name in names]
+    return _normalize_rows(np.hstack(blocks)), columns
+
+
+class SimilarityIndex:
+    """Top-K context neighbors per pattern, with cosine and shared-facet counts."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, neighbors: np.ndarray,
+                 scores: np.ndarray, shared: np.ndarray, source_stamp: np.ndarray):
+        self.ids = ids
+        self.titles = titles
+        self.neighbors = neighbors      # n x K rows, -1 padded
+        self.scores = scores            # n x K cosine similarity
+        self.shared = shared            # n x K count of shared facet values
+        self.source_stamp = source_stamp
+        self.index = {pid: i for i, pid in enumerate(ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def is_stale(self, path: Path = EXTRACTIONS_FILE) -> bool:
+        """True once the extractions file has changed since the index was built."""
+        return not path.exists() or not np.array_equal(_source_stamp(path), self.source_stamp)
+
+    @classmethod
+    def build(cls, extractions: list[dict], k: int = TOP_K,
+              source_stamp: Optional[np.ndarray] = None) -> "SimilarityIndex":
+        """Compute top-k neighbors for extraction records (pattern_id, pattern_name, facets)."""
+        extractions = sorted(extractions, key=lambda e: e['pattern_id'])
+        features, _ = feature_matrix(extractions)
+        present = (features > 0).astype(np.float32)
+        n = len(extractions)
+        k = min(k, max(n - 1, 0))
+
+        neighbors = np.full((n, k), -1, dtype=np.int32)
+        scores = np.zeros((n, k), dtype=np.float32)
+        shared = np.zeros((n, k), dtype=np.int16)
+        for start in range(0, n if k else 0, CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, n)
+            sims = features[start:stop] @ features.T
+            sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            top_sims = np.take_along_axis(sims, top, axis=1)
+            # Highest similarity first, ties by row (pattern id order)
+            order = np.lexsort((top, -top_sims), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            neighbors[start:stop] = top
+            scores[start:stop] = np.take_along_axis(sims, top, axis=1)
+            overlap = present[start:stop] @ present.T
+            shared[start:stop] = np.take_along_axis(overlap, top, axis=1)
+
+        valid = scores > 0
+        neighbors[~valid] = -1
+        return cls(
+            np.array([e['pattern_id'] for e in extractions]),
+            np.array([e.get('pattern_name') or '' for e in extractions]),
+            neighbors, scores, shared,
+            source_stamp if source_stamp is not None else np.zeros(2, dtype=np.int64),
+        )
+
+    def save(self, path: Path = INDEX_FILE) -> None:
+        """Persist the index next to the database, replacing the file atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write a per-process temp file and swap it in, so API workers and the
+        # exporter rebuilding concurrently never read a half-written index
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=self.ids, titles=self.titles, neighbors=self.neighbors,
+                     scores=self.scores, shared=self.shared, source_stamp=self.source_stamp)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> "SimilarityIndex":
+        """Load a previously saved index."""
+        with np.load(path) as data:
+            return cls(data['ids'], data['titles'], data['neighbors'], data['scores'],
+                       data['shared'], data['source_stamp'])
+
+    def similar(self, pattern_id: str, k: Optional[int] = None) -> list[dict]:
+        """Patterns sharing the most context with a pattern, most similar first."""
+        row = self.index.get(pattern_id)
+        if row is None:
+            return []
+        results = []
+        for neighbor, score, shared in zip(self.neighbors[row], self.scores[row], self.shared[row]):
+            if neighbor < 0:
+                break
+            results.append({
+                'pattern_id': str(self.ids[neighbor]),
+                'title': str(self.titles[neighbor]),
+                'score': round(float(score), 6),
+                'shared_contexts': int(shared)
+            })
+            if k is not None and len(results) == k:
+                break
+        return results
+
+
+def build_similarity_index(source: Path = EXTRACTIONS_FILE, path: Path = INDEX_FILE,
+                           k: int = TOP_K) -> SimilarityIndex:
+    """Build the neighbor index from the extractions file and save it."""
+    with open(source) as f:
+        # Later extractions of the same pattern supersede earlier ones
+        extractions = {e['pattern_id']: e for e in json.load(f) if e.get('pattern_id')}
+    index = SimilarityIndex.build(list(extractions.values()), k, _source_stamp(source))
+    index.save(path)
+    return index
+
+
+def load_similarity_index(source: Path = EXTRACTIONS_FILE,
+                          path: Path = INDEX_FILE) -> SimilarityIndex:
+    """Load the saved index, rebuilding it if the extractions have changed."""
+    if path.exists():
+        index = SimilarityIndex.load(path)
+        if not index.is_stale(source):
+            return index
+    return build_similarity_index(source, path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the pattern context similarity index")
+    parser.add_argument("title", nargs="?", help="Optional pattern title to look up")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_similarity_index()
+    print(f"✓ Top-{index.neighbors.shape[1]} context neighbors for {len(index)} patterns "
+          f"in {time.perf_counter() - start:.1f}s -> {INDEX_FILE}")
+
+    if args.title:
+        matches = [str(pid) for pid, title in zip(index.ids, index.titles) if title == args.title]
+        for pid in matches:
+            start = time.perf_counter()
+            similar = index.similar(pid, 10)
+            print(f"\nShares context with '{args.title}' ({(time.perf_counter() - start) * 1e6:.0f} µs):")
+            for s in similar:
+                print(f"  {s['score']:.3f}  ({s['shared_contexts']:2} shared)  {s['title']}")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Trigram Index for fuzzy pattern title matching
+
+Each title is split into padded character trigrams (as in PostgreSQL's
+pg_trgm) and stored as CSR postings (trigram -> title rows). A lookup reads
+the postings of the query's trigrams and scores shared / (|A| + |B| - shared),
+so a misspelled title resolves without an edit-distance loop over all titles.
+
+Usage:
+    python src/retrieval/trigram_index.py "lean strtup"
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_graph_version
+from retrieval.graph_snapshot import GraphSnapshot
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text: str) -> set[str]:
+    """Padded character trigrams of every word in text."""
+    grams = set()
+    for word in WORD_RE.findall((text or '').lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram postings over pattern titles with similarity scoring."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, grams: dict[str, int],
+                 offsets: np.ndarray, rows: np.ndarray, sizes: np.ndarray, version: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.grams = grams
+        self.offsets = offsets
+        self.rows = rows
+        self.sizes = sizes
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def is_stale(self) -> bool:
+        return get_graph_version() != self.version
+
+    @classmethod
+    def build(cls, ids: list[str], titles: list[str], version: int = 0) -> "TrigramIndex":
+        """Index titles (aligned with ids)."""
+        postings: dict[str, list[int]] = {}
+        sizes = np.zeros(len(titles), dtype=np.int32)
+        for row, title in enumerate(titles):
+            grams = trigrams(title)
+            sizes[row] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[gram]) for gram in vocab])
+        rows = np.array([row for gram in vocab for row in postings[gram]], dtype=np.int32)
+        return cls(np.asarray(ids), np.asarray(titles), {gram: i for i, gram in enumerate(vocab)},
+                   offsets, rows, sizes, version)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: GraphSnapshot) -> "TrigramIndex":
+        """Index the pattern titles held by an adjacency snapshot."""
+        return cls.build(snapshot.ids, snapshot.titles, snapshot.version)
+
+    def search(self, query: str, k: int = 10,
+               threshold: float = SIMILARITY_THRESHOLD) -> list[dict]:
+        """Titles most similar to query, with similarity >= threshold."""
+        query_grams = trigrams(query)
+        gram_ids = [self.grams[g] for g in query_grams if g in self.grams]
+        if not gram_ids:
+            return []
+
+        rows = np.concatenate([self.rows[self.offsets[g]:self.offsets[g + 1]] for g in gram_ids])
+        matched, shared = np.unique(rows, return_counts=True)
+        similarity = shared / (self.sizes[matched] + len(query_grams) - shared)
+
+        keep = np.flatnonzero(similarity >= threshold)
+        k = min(k, len(keep))
+        if not k:
+            return []
+        top = keep[np.argpartition(-similarity[keep], k - 1)[:k]]
+        top = top[np.lexsort((matched[top], -similarity[top]))]
+        return [
+            {
+                'pattern_id': str(self.ids[matched[i]]),
+                'title': str(self.titles[matched[i]]),
+                'similarity': round(float(similarity[i]), 4)
+            }
+            for i in top
+        ]
+
+    def best_match(self, query: str, threshold: float = SIMILARITY_THRESHOLD) -> Optional[dict]:
+        """The most similar title, or None if nothing clears the threshold."""
+        hits = self.search(query, 1, threshold)
+        return hits[0] if hits else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fuzzy-match pattern titles")
+    parser.add_argument("query", help="Possibly misspelled title")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = TrigramIndex.from_snapshot(GraphSnapshot.load())
+    print(f"✓ Indexed {len(index)} titles ({len(index.grams)} trigrams) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    hits = index.search(args.query, 10)
+    print(f"\nFuzzy matches for '{args.query}' ({(time.perf_counter() - start) * 1e6:.0f} µs):")
+    for hit in hits:
+        print(f"  {hit['similarity']:.3f}  {hit['title']}")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Typeahead Prefix Index for Pattern titles and slugs
+
+A sorted array of normalized keys (each title, each title suffix starting at
+a word boundary, and each slug), so completing a prefix is two binary
+searches plus a partial sort of the matching range. Completions are ranked
+title/slug prefix matches first, then inner-word matches, each by PageRank
+(or degree when the metrics side table is missing).
+
+Usage:
+    python src/retrieval/typeahead.py "lea"
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.compute_metrics import load_metrics
+from db.init_kuzu import get_connection, get_graph_version
+from retrieval.graph_snapshot import GraphSnapshot
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SPACE_RE = re.compile(r"\s+")
+PREFIX_END = "\U0010ffff"
+
+# Key kinds, in ranking order
+PREFIX_MATCH = 0   # start of the title or slug
+WORD_MATCH = 1     # start of a later word in the title
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace."""
+    return SPACE_RE.sub(' ', (text or '').lower()).strip()
+
+
+class TypeaheadIndex:
+    """Sorted-array prefix index with precomputed completion ranks."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, slugs: np.ndarray,
+                 scores: np.ndarray, keys: np.ndarray, rows: np.ndarray,
+                 ranks: np.ndarray, version: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.slugs = slugs
+        self.scores = scores
+        self.keys = keys
+        self.rows = rows
+        self.ranks = ranks
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def is_stale(self) -> bool:
+        return get_graph_version() != self.version
+
+    @classmethod
+    def build(cls, patterns: list[dict], scores: np.ndarray) -> "TypeaheadIndex":
+        """Index patterns (dicts with id, title, slug) ranked by `scores`."""
+        titles = [p['title'] or '' for p in patterns]
+        slugs = [p['slug'] or '' for p in patterns]
+        n = len(patterns)
+
+        # Global order of patterns: higher score first, then title
+        order = np.lexsort((np.array([t.lower() for t in titles]), -scores))
+        pattern_rank = np.empty(n, dtype=np.int64)
+        pattern_rank[order] = np.arange(n)
+
+        keys, rows, kinds = [], [], []
+        for row, (title, slug) in enumerate(zip(titles, slugs)):
+            title_key = normalize(title)
+            entries = {(title_key, PREFIX_MATCH), (normalize(slug), PREFIX_MATCH)}
+            for word in WORD_RE.finditer(title_key):
+                if word.start():
+                    entries.add((title_key[word.start():], WORD_MATCH))
+            for key, kind in entries:
+                if key:
+                    keys.append(key)
+                    rows.append(row)
+                    kinds.append(kind)
+
+        keys = np.array(keys)
+        rows = np.array(rows, dtype=np.int32)
+        ranks = np.array(kinds, dtype=np.int64) * n + pattern_rank[rows]
+        sort = np.argsort(keys, kind='stable')
+        return cls(
+            np.array([p['id'] for p in patterns]), np.array(titles), np.array(slugs),
+            scores.astype(np.float64), keys[sort], rows[sort], ranks[sort],
+        )
+
+    def complete(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Top completions for a typed prefix."""
+        prefix = normalize(prefix)
+        if not prefix or not len(self.keys) or limit <= 0:
+            return []
+
+        lo = int(np.searchsorted(self.keys, prefix, side='left'))
+        hi = int(np.searchsorted(self.keys, prefix + PREFIX_END, side='left'))
+        if lo == hi:
+            return []
+
+        ranks = self.ranks[lo:hi]
+        # A pattern can match through several keys, so over-fetch before deduping
+        fetch = min(len(ranks), limit * 4)
+        candidates = np.argpartition(ranks, fetch - 1)[:fetch] if fetch < len(ranks) else np.arange(len(ranks))
+        candidates = candidates[np.argsort(ranks[candidates])]
+
+        results, seen = [], set()
+        for i in candidates:
+            row = int(self.rows[lo + i])
+            if row in seen:
+                continue
+            seen.add(row)
+            results.append({
+                'pattern_id': str(self.ids[row]),
+                'title': str(self.titles[row]),
+                'slug': str(self.slugs[row]),
+                'score': float(self.scores[row])
+            })
+            if len(results) == limit:
+                break
+
+        if len(results) < limit and fetch < len(ranks):
+            return self._complete_all(lo, hi, limit)
+        return results
+
+    def _complete_all(self, lo: int, hi: int, limit: int) -> list[dict]:
+        order = np.argsort(self.ranks[lo:hi])
+        rows = self.rows[lo:hi][order]
+        _, first = np.unique(rows, return_index=True)
+        return [
+            {
+                'pattern_id': str(self.ids[row]),
+                'title': str(self.titles[row]),
+                'slug': str(self.slugs[row]),
+                'score': float(self.scores[row])
+            }
+            for row in rows[np.sort(first)[:limit]]
+        ]
+
+
+def build_typeahead_index(conn=None, snapshot: Optional[GraphSnapshot] = None,
+                          metrics: Optional[dict] = None) -> TypeaheadIndex:
+    """Index every pattern, ranked by PageRank from the metrics side table.
+
+    Falls back to degree from the adjacency snapshot when no metrics have
+    been computed for the current graph version.
+    """
+    if conn is None:
+        db, conn = get_connection()
+    version = get_graph_version()
+
+    patterns = []
+    result = conn.execute('MATCH (p:Pattern) RETURN p.id, p.title, p.slug ORDER BY p.id')
+    while result.has_next():
+        row = result.get_next()
+        patterns.append({'id': row[0], 'title': row[1], 'slug': row[2]})
+
+    if metrics is None:
+        metrics = load_metrics()
+    if metrics:
+        pagerank = {p['pattern_id']: p['pagerank'] for p in metrics['patterns']}
+        scores = np.array([pagerank.get(p['id'], 0.0) for p in patterns])
+    else:
+        snapshot = snapshot or GraphSnapshot.load(conn)
+        degree = snapshot.degree()
+        scores = np.array([
+            degree[snapshot.index[p['id']]] if p['id'] in snapshot.index else 0
+            for p in patterns
+        ], dtype=np.float64)
+
+    index = TypeaheadIndex.build(patterns, scores)
+    index.version = version
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Complete pattern titles from a prefix")
+    parser.add_argument("prefix", help="Typed prefix")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_typeahead_index()
+    print(f"✓ Indexed {len(index)} patterns ({len(index.keys)} keys) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    completions = index.complete(args.prefix, args.limit)
+    print(f"\nCompletions for '{args.prefix}' ({(time.perf_counter() - start) * 1e6:.0f} µs):")
+    for c in completions:
+        print(f"  {c['score']:.5f}  {c['title']}")
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Pattern Embedding Index for Context Engine
+
+Computes embeddings for Pattern title/summary/content offline and keeps them
+in a normalized NumPy matrix, so a semantic lookup is one matrix-vector
+product instead of a scan over every Pattern node.
+
+Two backends are supported:
+- "model": a local sentence-transformers model, used when it is installed
+- "lsa": hashed TF-IDF features reduced with a truncated SVD (no extra deps)
+
+Usage:
+    python src/retrieval/vector_index.py            # build and save the index
+    python src/retrieval/vector_index.py "commons"  # build, then query
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.init_kuzu import get_connection, get_content_version
+
+# Configuration
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+INDEX_FILE = DATA_DIR / "pattern_embeddings.npz"
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+HASH_DIM = 4096          # Hashed feature buckets for the LSA backend
+LSA_DIM = 256            # Dimensions kept after the truncated SVD
+CONTENT_CHARS = 2000     # Leading content characters used per pattern
+FIELD_WEIGHTS = {'title': 3.0, 'summary': 2.0, 'content': 1.0}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens plus adjacent bigrams."""
+    words = TOKEN_RE.findall((text or '').lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def hash_features(fields: dict[str, str]) -> dict[int, float]:
+    """Map weighted field tokens to hashed feature buckets."""
+    features: dict[int, float] = {}
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS.get(field, 1.0)
+        for token in tokenize(text):
+            bucket = zlib.crc32(token.encode('utf-8')) % HASH_DIM
+            features[bucket] = features.get(bucket, 0.0) + weight
+    return features
+
+
+def load_model():
+    """Load the local sentence-transformers model, or None if unavailable."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    return SentenceTransformer(MODEL_NAME)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _truncated_svd(matrix: np.ndarray, dim: int, n_iter: int = 4) -> np.ndarray:
+    """Randomized truncated SVD; returns the feature-space components (d x dim)."""
+    rng = np.random.default_rng(0)
+    dim = min(dim, *matrix.shape)
+    omega = rng.standard_normal((matrix.shape[1], dim + 10)).astype(np.float32)
+    q, _ = np.linalg.qr(matrix @ omega)
+    for _ in range(n_iter):
+        q, _ = np.linalg.qr(matrix @ (matrix.T @ q))
+    _, _, vt = np.linalg.svd(q.T @ matrix, full_matrices=False)
+    return vt[:dim].T.astype(np.float32)
+
+
+class EmbeddingIndex:
+    """Normalized pattern embeddings with brute-force cosine search."""
+
+    def __init__(self, ids: np.ndarray, titles: np.ndarray, vectors: np.ndarray,
+                 backend: str, idf: Optional[np.ndarray] = None,
+                 components: Optional[np.ndarray] = None, version: int = 0):
+        self.ids = ids
+        self.titles = titles
+        self.vectors = vectors
+        self.backend = backend
+        self.idf = idf
+        self.components = components
+        self.version = version
+        self._model = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, patterns: list[dict], backend: Optional[str] = None) -> "EmbeddingIndex":
+        """Embed patterns (dicts with id, title, summary, content).
+
+        With no backend, the model is used if available and LSA otherwise; a
+        forced 'model' backend raises if sentence-transformers can't be loaded.
+        """
+        ids = np.array([p['id'] for p in patterns])
+        titles = np.array([p['title'] or '' for p in patterns])
+
+        model = load_model() if backend in (None, 'model') else None
+        if backend == 'model' and model is None:
+            raise RuntimeError("The 'model' backend needs sentence-transformers (pip install sentence-transformers)")
+        if model is not None:
+            texts = [
+                f"{p['title'] or ''}. {p['summary'] or ''} {(p['content'] or '')[:CONTENT_CHARS]}"
+                for p in patterns
+            ]
+            vectors = model.encode(texts, normalize_embeddings=True).astype(np.float32)
+            index = cls(ids, titles, vectors, 'model')
+            index._model = model
+            return index
+
+        # Hashed TF-IDF -> LSA fallback
+        tf = np.zeros((len(patterns), HASH_DIM), dtype=np.float32)
+        for row, p in enumerate(patterns):
+            features = hash_features({
+                'title': p['title'],
+                'summary': p['summary'],
+                'content': (p['content'] or '')[:CONTENT_CHARS],
+            })
+            if features:
+                tf[row, list(features)] = list(features.values())
+        np.log1p(tf, out=tf)
+
+        df = np.count_nonzero(tf, axis=0)
+        idf = (np.log((1 + len(patterns)) / (1 + df)) + 1).astype(np.float32)
+        tfidf = _normalize_rows(tf * idf)
+
+        components = _truncated_svd(tfidf, LSA_DIM)
+        vectors = _normalize_rows(tfidf @ components).astype(np.float32)
+        return cls(ids, titles, vectors, 'lsa', idf=idf, components=components)
+
+    def save(self, path: Path = INDEX_FILE) -> None:
+        """Persist the index next to the database, replacing the file atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {'ids': self.ids, 'titles': self.titles, 'vectors': self.vectors,
+                  'backend': np.array(self.backend), 'version': np.array(self.version)}
+        if self.backend == 'lsa':
+            arrays['idf'] = self.idf
+            arrays['components'] = self.components
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> "EmbeddingIndex":
+        """Load a previously saved index."""
+        with np.load(path) as data:
+            backend = str(data['backend'])
+            return cls(
+                data['ids'], data['titles'], data['vectors'], backend,
+                idf=data['idf'] if 'idf' in data else None,
+                components=data['components'] if 'components' in data else None,
+                version=int(data['version']) if 'version' in data else 0,
+            )
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Embed a query into the index space; None if it has no usable terms."""
+        if self.backend == 'model':
+            if self._model is None:
+                self._model = load_model()
+                if self._model is None:
+                    raise RuntimeError(
+                        f"Index was built with {MODEL_NAME} but sentence-transformers is not installed"
+                    )
+            return self._model.encode([query], normalize_embeddings=True)[0].astype(np.float32)
+
+        features = hash_features({'title': query})
+        if not features:
+            return None
+        buckets = np.fromiter(features, dtype=np.int64)
+        weights = np.log1p(np.fromiter(features.values(), dtype=np.float32)) * self.idf[buckets]
+        vector = weights @ self.components[buckets]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def search(self, query: str, k: int = 10) -> list[dict]:
+        """Top-k patterns by cosine similarity to the query."""
+        vector = self.embed_query(query)
+        if vector is None or not len(self):
+            return []
+
+        scores = self.vectors @ vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {'pattern_id': str(self.ids[i]), 'title': str(self.titles[i]), 'score': float(scores[i])}
+            for i in top
+        ]
+
+
+def fetch_pattern_texts(conn) -> list[dict]:
+    """Fetch the text fields of every pattern from the graph."""
+    result = conn.execute("""
+        MATCH (p:Pattern)
+        RETURN p.id, p.title, p.summary, p.content
+        ORDER BY p.id
+    """)
+    patterns = []
+    while result.has_next():
+        row = result.get_next()
+        patterns.append({'id': row[0], 'title': row[1], 'summary': row[2], 'content': row[3]})
+    return patterns
+
+
+def build_embedding_index(conn=None, path: Path = INDEX_FILE,
+                          backend: Optional[str] = None) -> EmbeddingIndex:
+    """Embed every pattern in the graph and save the index."""
+    if conn is None:
+        db, conn = get_connection()
+    version = get_content_version()
+    index = EmbeddingIndex.build(fetch_pattern_texts(conn), backend=backend)
+    index.version = version
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the pattern embedding index")
+    parser.add_argument("query", nargs="?", help="Optional query to run after building")
+    parser.add_argument("--backend", choices=["model", "lsa"], help="Force an embedding backend")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_embedding_index(backend=args.backend)
+    print(f"✓ Embedded {len(index)} patterns with '{index.backend}' "
+          f"({index.vectors.shape[1]} dims) in {time.perf_counter() - start:.1f}s -> {INDEX_FILE}")
+
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, 10)
+        print(f"\nTop matches for '{args.query}' ({(time.perf_counter() - start) * 1000:.2f} ms):")
+        for hit in hits:
+            print(f"  {hit['score']:.3f}  {hit['title']}")